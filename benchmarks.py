@@ -0,0 +1,404 @@
+"""
+Benchmarks for the scraper's hot paths.
+
+Usage:
+    python benchmarks.py extraction <maps_url> [--max-reviews N] [--headless false]
+    python benchmarks.py dates [--reviews N]
+    python benchmarks.py keywords [--names N] [--sizes 80,1000,5000,20000] [--backend c|python]
+    python benchmarks.py dedup [--reviews N] [--batch N]
+    python benchmarks.py e2e [--sizes 50,500,5000] [--paths batch,per-element,rpc,windowed] [--repeat N]
+    python benchmarks.py throttle [--workers 8] [--seconds 30] [--qps-limit 10]
+"""
+import os
+import sys
+import time
+import re
+import random
+import argparse
+import threading
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_script(filename, module_name):
+    """Imports one of the hyphenated top-level scripts as a module."""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class RoundTripCounter:
+    """
+    Counts WebDriver commands. Every find_element / get_attribute / execute_script,
+    including those issued through WebElements, goes through driver.execute().
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.count = 0
+        self._execute = driver.execute
+
+        def counting_execute(*args, **kwargs):
+            self.count += 1
+            return self._execute(*args, **kwargs)
+
+        driver.execute = counting_execute
+
+    def reset(self):
+        self.count = 0
+
+    def restore(self):
+        self.driver.execute = self._execute
+
+def load_review_cards(driver, max_reviews):
+    """Scrolls the reviews panel until max_reviews cards are loaded or it stops growing."""
+    from selenium.webdriver.common.by import By
+
+    scrollable = driver.find_element(By.CSS_SELECTOR, "div.m6QErb.DxyBCb, div.m6QErb")
+    stagnant = 0
+    count = 0
+    while count < max_reviews and stagnant < 10:
+        driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", scrollable)
+        time.sleep(0.3)
+        new_count = len(driver.find_elements(By.CSS_SELECTOR, "div.jftiEf"))
+        stagnant = stagnant + 1 if new_count == count else 0
+        count = new_count
+    return driver.find_elements(By.CSS_SELECTOR, "div.jftiEf")
+
+def bench_extraction(args):
+    scraper = load_script("google-maps-scraper.py", "google_maps_scraper")
+    driver = scraper.setup_driver(headless=args.headless.lower() != "false")
+    try:
+        driver.get(args.url)
+        scraper.dismiss_consent(driver)
+        if not scraper.click_reviews_button(driver):
+            print("[ERROR] Reviews tab not found; cannot benchmark.")
+            return 1
+        cards = load_review_cards(driver, args.max_reviews)
+        print(f"[INFO] Loaded {len(cards)} review cards.")
+
+        counter = RoundTripCounter(driver)
+        rows = []
+
+        counter.reset()
+        start = time.perf_counter()
+        per_element = [scraper.extract_review_card(driver, card) for card in cards]
+        rows.append(("per-element", counter.count, time.perf_counter() - start, len(per_element)))
+
+        counter.reset()
+        start = time.perf_counter()
+        batch = scraper.extract_reviews_batch(driver) or []
+        rows.append(("batch", counter.count, time.perf_counter() - start, len(batch)))
+        counter.restore()
+
+        print(f"{'path':<12} {'round trips':>12} {'wall (s)':>10} {'cards':>7}")
+        for path, trips, wall, n in rows:
+            print(f"{path:<12} {trips:>12} {wall:>10.3f} {n:>7}")
+        return 0
+    finally:
+        driver.quit()
+
+# Roughly the mix seen on Kyiv-region places: mostly uk, some ru/en, a few edited.
+DATE_PHRASES = (
+    ["тиждень тому", "2 тижні тому", "3 тижні тому", "місяць тому", "день тому", "3 дні тому"]
+    + [f"{n} місяці тому" for n in range(2, 5)] + [f"{n} місяців тому" for n in range(5, 12)]
+    + ["рік тому", "2 роки тому", "3 роки тому", "4 роки тому", "5 років тому", "Змінено 2 місяці тому"]
+    + ["неделю назад", "месяц назад", "3 месяца назад", "год назад", "2 года назад", "5 лет назад"]
+    + ["a week ago", "a month ago", "4 months ago", "a year ago", "2 years ago", "Edited 3 weeks ago"]
+)
+
+def bench_dates(args):
+    import dateparser
+    from datetime import datetime, timedelta
+
+    scraper = load_script("google-maps-scraper.py", "google_maps_scraper")
+    rng = random.Random(42)
+    corpus = [rng.choice(DATE_PHRASES) for _ in range(args.reviews)]
+
+    def dateparser_only(text):
+        """The pre-cache parse_relative_date: dateparser on every call, legacy regex fallback."""
+        cleaned = text.lower().replace("edited", "").replace("змінено", "").strip()
+        now = datetime.now()
+        parsed = dateparser.parse(
+            cleaned,
+            settings={"RELATIVE_BASE": now, "PREFER_DATES_FROM": "past", "DATE_ORDER": "DMY"},
+            languages=["uk", "ru", "en"],
+        )
+        if not parsed:
+            m = re.search(r"\d+", cleaned)
+            n = int(m.group()) if m else 1
+            for stem, days in (("рік", 365), ("рок", 365), ("місяц", 30), ("тиж", 7), ("дн", 1), ("день", 1)):
+                if stem in cleaned:
+                    parsed = now - timedelta(days=days * n)
+                    break
+        return parsed.strftime("%Y-%m-%d") if parsed else "Unknown"
+
+    rows = []
+    for label, fn in (("dateparser", dateparser_only), ("rules+cache", scraper.parse_relative_date)):
+        scraper.resolve_date_text.cache_clear()
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        rows.append((label, time.perf_counter() - start))
+
+    mismatches = [t for t in DATE_PHRASES if dateparser_only(t) != scraper.parse_relative_date(t)]
+    base = rows[0][1]
+    print(f"{'path':<12} {'total (s)':>10} {'us/review':>10} {'speedup':>8}")
+    for label, wall in rows:
+        print(f"{label:<12} {wall:>10.3f} {wall / len(corpus) * 1e6:>10.1f} {base / wall:>7.1f}x")
+    print(f"[INFO] {len(corpus)} phrases, cache: {scraper.resolve_date_text.cache_info()}")
+    if mismatches:
+        print(f"[WARN] Results differ from dateparser for: {mismatches}")
+    return 0
+
+def bench_keywords(args):
+    from keyword_matcher import KeywordMatcher, load_keywords
+
+    rng = random.Random(7)
+    real = load_keywords(os.path.join(HERE, "exclude_keywords.txt"))
+    alphabet = "абвгдеєжзиіїйклмнопрстуфхцчшщьюяabcdefghijklmnopqrstuvwxyz"
+
+    def word(lo, hi):
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(lo, hi)))
+
+    names = [
+        " ".join(word(3, 10) for _ in range(rng.randint(2, 5))) if rng.random() > 0.1
+        else f"{rng.choice(['ТОВ', 'ЦНАП', 'Центр'])} {rng.choice(real)}"
+        for _ in range(args.names)
+    ]
+
+    print(f"{'keywords':>9} {'naive names/s':>14} {'matcher names/s':>16} {'build (ms)':>11}   [{args.backend or 'auto'}]")
+    for size in (int(x) for x in args.sizes.split(",")):
+        keywords = (real + [word(5, 14) for _ in range(size)])[:size]
+        lowered = [k.lower() for k in keywords]
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords, args.backend)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        naive_hits = [any(k in n.lower() for k in lowered) for n in names]
+        naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits = [matcher.search(n) is not None for n in names]
+        fast = time.perf_counter() - start
+
+        if hits != naive_hits:
+            print(f"[WARN] matcher disagrees with naive scan at {size} keywords")
+        print(f"{size:>9} {len(names) / naive:>14.0f} {len(names) / fast:>16.0f} {build * 1000:>11.1f}")
+    return 0
+
+def bench_dedup(args):
+    import tempfile
+    from dedup_index import ReviewIndex, review_key
+
+    keys = [review_key(f"Place {i % 5000}", f"{i:020x}") for i in range(args.reviews)]
+    probes = keys[::10] + [review_key("Elsewhere", f"{i:020x}") for i in range(len(keys) // 10)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.sqlite3")
+        index = ReviewIndex(path, capacity=args.reviews)
+        start = time.perf_counter()
+        for i in range(0, len(keys), args.batch):
+            index.add(keys[i:i + args.batch])
+        insert = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits = sum(index.seen(k) for k in probes)
+        lookup = time.perf_counter() - start
+        bloom_hits = sum(k in index.bloom for k in probes[len(probes) // 2:])
+        index.close()
+
+        start = time.perf_counter()
+        ReviewIndex(path, capacity=args.reviews).close()
+        reopen = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+
+    print(f"{'reviews':>10} {'inserts/s':>10} {'lookups/s':>10} {'bloom FP %':>10} {'reopen (s)':>10} {'disk (MB)':>10}")
+    print(f"{len(keys):>10} {len(keys) / insert:>10.0f} {len(probes) / lookup:>10.0f} "
+          f"{bloom_hits / (len(probes) // 2) * 100:>10.2f} {reopen:>10.2f} {size / 2**20:>10.1f}")
+    if hits != len(keys[::10]):
+        print(f"[WARN] expected {len(keys[::10])} duplicates, index reported {hits}")
+    return 0
+
+class PeakRSS:
+    """Samples the RSS of this process plus Chrome/chromedriver children in the background."""
+    def __init__(self, rss_fn, interval=0.25):
+        self.rss_fn = rss_fn
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.rss_fn(os.getpid()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def bench_e2e(args):
+    """
+    Runs scrape_place() against local fixture pages (see mock_server.py maps) so
+    code paths can be compared reproducibly without network access.
+    """
+    mock = load_script("mock_server.py", "mock_server")
+    scraper = load_script("google-maps-scraper.py", "google_maps_scraper")
+
+    server = mock.make_maps_server(args.port, args.fixtures)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{args.port}/maps/place"
+
+    rows = []
+    try:
+        for path in args.paths.split(","):
+            batch = path != "per-element"
+            for page in args.sizes.split(","):
+                # A number is a synthetic page with that many cards; anything else a recorded page name
+                size = int(page) if page.isdigit() else 100000
+                name = f"fixture-{page}" if page.isdigit() else page
+                driver = scraper.setup_driver(headless=True, capture_rpc=path == "rpc")
+                try:
+                    reviews = 0
+                    flushed = []
+                    window = args.window if path == "windowed" else 0
+                    with PeakRSS(scraper.process_tree_rss) as rss:
+                        start = time.perf_counter()
+                        for i in range(args.repeat):
+                            url = f"{base}/{name}/@50.4501,30.5234,17z"
+                            reviews += len(scraper.scrape_place(driver, url, i + 1, size, batch=batch,
+                                                                rpc=path == "rpc", window=window,
+                                                                flush=lambda b: flushed.append(len(b)),
+                                                                time_limit=0))
+                        reviews += sum(flushed)
+                        wall = time.perf_counter() - start
+                finally:
+                    driver.quit()
+                rows.append((path, page, args.repeat, reviews, wall, rss.peak))
+    finally:
+        server.shutdown()
+
+    print(f"{'path':<12} {'page':>6} {'pages/min':>10} {'reviews/s':>10} {'wall (s)':>9} {'peak RSS (MB)':>14}")
+    for path, page, pages, reviews, wall, peak in rows:
+        print(f"{path:<12} {page:>6} {pages / wall * 60:>10.2f} {reviews / wall:>10.1f} "
+              f"{wall:>9.1f} {peak / 2**20:>14.0f}")
+    return 0
+
+def bench_throttle(args):
+    """
+    Hammers a throttling mock maps server with plain HTTP workers (no browser),
+    with and without ThrottleScheduler, and compares sustained throughput.
+    """
+    import requests
+    from throttle import ThrottleScheduler, classify_throttle
+    mock = load_script("mock_server.py", "mock_server")
+    base = f"http://127.0.0.1:{args.port}/maps/place"
+
+    def run(scheduler):
+        throttle = mock.MapsThrottle(args.qps_limit, args.rate, penalty=args.penalty)
+        server = mock.make_maps_server(args.port, throttle=throttle)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        counts = {"ok": 0, "throttled": 0}
+        lock = threading.Lock()
+        deadline = time.time() + args.seconds
+
+        def worker(worker_id):
+            session = requests.Session()
+            while time.time() < deadline:
+                if scheduler:
+                    scheduler.acquire(worker_id)
+                throttled = False
+                try:
+                    response = session.get(f"{base}/fixture-20/@50.4501,30.5234,17z", timeout=10)
+                    text = response.text
+                    throttled = bool(classify_throttle(response.url, text, 'id="captcha-form"' in text,
+                                                       'class="DUwDvf"' in text))
+                    time.sleep(args.place_time)  # stands in for scrolling the reviews
+                finally:
+                    if scheduler:
+                        scheduler.release(worker_id, throttled)
+                with lock:
+                    counts["throttled" if throttled else "ok"] += 1
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.workers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+        return counts, wall
+
+    rows = []
+    for mode in args.modes.split(","):
+        scheduler = None
+        if mode == "adaptive":
+            scheduler = ThrottleScheduler(args.workers, cooldown=args.cooldown)
+        counts, wall = run(scheduler)
+        total = counts["ok"] + counts["throttled"]
+        concurrency = scheduler.summary()["concurrency"] if scheduler else args.workers
+        rows.append((mode, counts["ok"] / wall * 60, counts["throttled"], total, concurrency))
+
+    print(f"{'mode':<10} {'places/min':>10} {'throttled':>10} {'attempts':>9} {'final workers':>14}")
+    for mode, rate, throttled, total, concurrency in rows:
+        print(f"{mode:<10} {rate:>10.1f} {throttled:>10} {total:>9} {concurrency:>14}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extraction", help="per-element vs batch review card extraction")
+    p.add_argument("url", help="Google Maps place URL with reviews")
+    p.add_argument("--max-reviews", type=int, default=200)
+    p.add_argument("--headless", default="true")
+    p.set_defaults(func=bench_extraction)
+
+    p = sub.add_parser("dates", help="parse_relative_date rule table + cache vs plain dateparser")
+    p.add_argument("--reviews", type=int, default=5000, help="number of date phrases to parse")
+    p.set_defaults(func=bench_dates)
+
+    p = sub.add_parser("keywords", help="compiled keyword matcher vs any(k in name) as keyword count grows")
+    p.add_argument("--names", type=int, default=5000, help="number of candidate names to scan")
+    p.add_argument("--sizes", default="80,1000,5000,20000", help="comma-separated keyword counts")
+    p.add_argument("--backend", choices=["c", "python"], help="matcher automaton (default: pyahocorasick if installed)")
+    p.set_defaults(func=bench_keywords)
+
+    p = sub.add_parser("dedup", help="review dedup index: insert/lookup rate, Bloom false positives, reopen time")
+    p.add_argument("--reviews", type=int, default=1_000_000, help="reviews stored in the index")
+    p.add_argument("--batch", type=int, default=200, help="reviews added per place")
+    p.set_defaults(func=bench_dedup)
+
+    p = sub.add_parser("e2e", help="end-to-end scrape of offline fixture pages")
+    p.add_argument("--sizes", default="50,500,5000", help="review cards per synthetic page, or recorded page names")
+    p.add_argument("--paths", default="batch,per-element,rpc", help="extraction code paths to compare (also: windowed)")
+    p.add_argument("--window", type=int, default=200, help="reviews per flush for the windowed path")
+    p.add_argument("--repeat", type=int, default=1, help="pages scraped per size and path")
+    p.add_argument("--port", type=int, default=8766)
+    p.add_argument("--fixtures", help="directory of recorded place pages to serve alongside the synthetic ones")
+    p.set_defaults(func=bench_e2e)
+
+    p = sub.add_parser("throttle", help="fixed vs adaptive worker pacing against a throttling mock server")
+    p.add_argument("--modes", default="fixed,adaptive", help="comma-separated: fixed (no scheduler), adaptive")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--seconds", type=float, default=30, help="duration of each run")
+    p.add_argument("--place-time", type=float, default=0.2, help="simulated seconds spent on each place")
+    p.add_argument("--qps-limit", type=float, default=10, help="mock server: place pages/s tolerated before blocking")
+    p.add_argument("--rate", type=float, default=0.01, help="mock server: fraction of pages throttled at random")
+    p.add_argument("--penalty", type=float, default=3, help="mock server: seconds blocked after exceeding --qps-limit")
+    p.add_argument("--cooldown", type=float, default=1, help="scheduler cooldown (scaled down for the benchmark)")
+    p.add_argument("--port", type=int, default=8767)
+    p.set_defaults(func=bench_throttle)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Persistent set of review keys seen across runs and places.
+
+Keys are 64-bit hashes stored in a SQLite rowid table (about 10 bytes per
+review on disk). An in-memory Bloom filter sits in front of it, so the common
+case -- a review never seen before -- is answered without touching SQLite;
+only Bloom hits are confirmed with an exact lookup. The filter is saved next
+to the database on close and rebuilt from the table if the two disagree.
+"""
+import os
+import re
+import math
+import struct
+import sqlite3
+import hashlib
+import threading
+
+BLOOM_MAGIC = b"RIDX1"
+BLOOM_HEADER = struct.Struct(">5sQBQ")  # magic, bits, hashes, rows covered
+DEFAULT_CAPACITY = 20_000_000
+DEFAULT_ERROR_RATE = 0.01
+
+
+def review_key(organization, fingerprint):
+    """
+    Signed 64-bit key for a review: the place's name plus the review fingerprint,
+    so the same review reached through a short link and a place_id link matches.
+    """
+    org = re.sub(r"\s+", " ", (organization or "").strip().lower())
+    digest = hashlib.sha1(f"{org}\x1f{fingerprint}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class BloomFilter:
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE, bits=None, hashes=None):
+        self.bits = bits or self.bits_for(capacity, error_rate)
+        self.hashes = hashes or max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+
+    @staticmethod
+    def bits_for(capacity, error_rate):
+        return max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+
+    def _positions(self, key):
+        key &= 0xFFFFFFFFFFFFFFFF
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path, rows):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.bits, self.hashes, rows))
+            f.write(self.array)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns (filter, rows covered), or (None, 0) if the file is missing or unreadable."""
+        try:
+            with open(path, "rb") as f:
+                magic, bits, hashes, rows = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+                if magic != BLOOM_MAGIC:
+                    return None, 0
+                bloom = cls(bits=bits, hashes=hashes)
+                if f.readinto(bloom.array) != len(bloom.array):
+                    return None, 0
+        except (OSError, struct.error):
+            return None, 0
+        return bloom, rows
+
+
+class ReviewIndex:
+    """
+    Dedup index shared by all workers. seen() answers at extraction time,
+    add() records reviews once they have been written out.
+    """
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.bloom_path = os.path.splitext(path)[0] + ".bloom"
+        self.lookups = self.confirmed = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (h INTEGER PRIMARY KEY)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('rows', 0)")
+        self._conn.commit()
+        self.rows = self._conn.execute("SELECT value FROM meta WHERE name = 'rows'").fetchone()[0]
+
+        bloom, covered = BloomFilter.load(self.bloom_path)
+        needed_bits = BloomFilter.bits_for(max(capacity, self.rows), error_rate)
+        if bloom is None or covered != self.rows or bloom.bits < needed_bits:
+            # Missing, stale (crash before close) or outgrown: rebuild with room to grow.
+            bloom = BloomFilter(capacity if self.rows <= capacity else self.rows * 2, error_rate)
+            if self.rows:
+                print(f"[INFO] Rebuilding the dedup filter from {self.rows} stored reviews...")
+                for (h,) in self._conn.execute("SELECT h FROM seen"):
+                    bloom.add(h)
+        self.bloom = bloom
+
+    def seen(self, key):
+        with self._lock:
+            self.lookups += 1
+            if key not in self.bloom:
+                return False
+            found = self._conn.execute("SELECT 1 FROM seen WHERE h = ?", (key,)).fetchone() is not None
+            self.confirmed += found
+            return found
+
+    def add(self, keys):
+        keys = list(keys)
+        if not keys:
+            return 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO seen (h) VALUES (?)", ((k,) for k in keys))
+            added = self._conn.total_changes - before
+            self._conn.execute("UPDATE meta SET value = value + ? WHERE name = 'rows'", (added,))
+            self.rows += added
+            for k in keys:
+                self.bloom.add(k)
+        return added
+
+    def summary(self):
+        with self._lock:
+            return {"stored": self.rows, "lookups": self.lookups, "duplicates": self.confirmed}
+
+    def close(self):
+        with self._lock:
+            self.bloom.save(self.bloom_path, self.rows)
+            self._conn.close()
@@ -1,12 +1,21 @@
-import sys
 import time
 import json
+import queue
+import argparse
+import threading
+import socket
+import sqlite3
+import base64
+import hashlib
+from functools import lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import pandas as pd
 import dateparser
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
@@ -15,21 +24,149 @@ from webdriver_manager.chrome import ChromeDriverManager
 import os
 import re
 from urllib.parse import urlparse, parse_qs, unquote
+from dedup_index import ReviewIndex, review_key
+from work_queue import TaskQueue, RemoteTaskQueue, make_queue_server, is_loopback
+from throttle import ThrottleScheduler, classify_throttle
 
 # ---------- helpers ----------
-def expand_google_maps_url(short_url):
+MAX_REDIRECTS = 8
+
+def expand_google_maps_url(short_url, session=None):
+    """
+    Follows a short link's redirects by their Location headers only, so the
+    final Maps page is never downloaded. Returns the Maps URL or None.
+    """
+    http = session or requests
+    url = short_url
     try:
-        response = requests.get(short_url, allow_redirects=True, timeout=10)
-        if "google.com/maps" in response.url:
-            print(f"[INFO] Expanded URL: {response.url}")
-            return response.url
+        for _ in range(MAX_REDIRECTS):
+            if "google.com/maps" in url and "consent.google" not in url:
+                break
+            if not is_short_url(url) and "google." not in urlparse(url).netloc:
+                break  # left Google: not a Maps link
+            if "consent.google" in url:
+                # Consent interstitial: the real target is in ?continue=
+                target = parse_qs(urlparse(url).query).get("continue", [None])[0]
+                if not target:
+                    break
+                url = target
+                continue
+            response = http.get(url, allow_redirects=False, timeout=10)
+            location = response.headers.get("Location")
+            response.close()
+            if not location:
+                break
+            url = requests.compat.urljoin(url, location)
+        if "google.com/maps" in url:
+            print(f"[INFO] Expanded URL: {url}")
+            return url
         print("[WARN] Expanded URL does not appear to be Google Maps.")
         return None
     except Exception as e:
         print(f"[ERROR] URL expansion failed: {e}")
         return None
 
-def setup_driver(headless=True):
+# ---------- browser ----------
+# Resources the scraper never reads. Patterns use CDP Network.setBlockedURLs syntax ('*' wildcard).
+BLOCK_PRESETS = {
+    "off": [],
+    "default": [
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*fonts.gstatic.com*", "*fonts.googleapis.com*",
+        "*/maps/vt?*", "*/maps/vt/*", "*/kh/v=*", "*khms*.google.com*", "*streetviewpixels*",
+        "*googleusercontent.com*",  # avatars and review photos
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*/gen_204*", "*/log?*", "*play.google.com/log*", "*/maps/preview/log*",
+    ],
+}
+BLOCK_PRESETS["lean"] = BLOCK_PRESETS["default"] + [
+    "*.mp4", "*.webm", "*ogs.google.com*", "*apis.google.com*", "*/maps/api/js/StaticMapService*",
+    "*/maps/preview/pwa*", "*/maps/photometa*", "*/maps/preview/photo*", "*/maps/preview/directions*",
+    "*/maps/preview/entitylist*", "*/maps/preview/lp*", "*/maps/vt/icon*", "*gstatic.com/images*",
+]
+# Never blocked, whatever the preset: the place page itself, Maps app JS and the review list XHRs.
+ALLOW_PATTERNS = [
+    "*/maps/rpc/listugcposts*", "*/maps/preview/review/*", "*/maps/preview/place*",
+    "*/maps/_/js/*", "*/maps/place/*", "*consent.google.com*",
+]
+
+LEAN_CHROME_ARGS = [
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+def _pattern_to_regex(pattern):
+    return re.compile("^" + ".*".join(re.escape(part) for part in pattern.split("*")) + "$")
+
+def effective_block_list(preset="default", extra=None, allow=None):
+    """
+    Block patterns for a preset, minus any that would also match an allowlisted
+    pattern (CDP has no allow rules, so conflicts are resolved here).
+    """
+    patterns = list(BLOCK_PRESETS[preset]) + list(extra or [])
+    allow = list(ALLOW_PATTERNS) + list(allow or [])
+    # An allow pattern, with its wildcards filled by a token, is a sample URL the block rule must not hit.
+    samples = [a.replace("*", "x/") for a in allow]
+    kept = []
+    for pattern in patterns:
+        rx = _pattern_to_regex(pattern)
+        clash = next((a for a, sample in zip(allow, samples) if rx.match(sample)), None)
+        if clash:
+            print(f"[WARN] Not blocking {pattern}: it would also block allowlisted {clash}")
+            continue
+        kept.append(pattern)
+    return kept
+
+DRIVER_PATH_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "google-maps-scraper", "chromedriver.json")
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+def chromedriver_path(refresh=False):
+    """
+    Resolves chromedriver once per process and remembers it on disk, so workers,
+    restarts and later runs skip ChromeDriverManager's version lookup.
+    CHROMEDRIVER_PATH overrides everything.
+    """
+    global _driver_path
+    if os.environ.get("CHROMEDRIVER_PATH"):
+        return os.environ["CHROMEDRIVER_PATH"]
+    with _driver_path_lock:
+        if not refresh:
+            if _driver_path and os.path.exists(_driver_path):
+                return _driver_path
+            try:
+                with open(DRIVER_PATH_CACHE, "r", encoding="utf-8") as f:
+                    cached = json.load(f).get("path")
+                if cached and os.path.exists(cached):
+                    _driver_path = cached
+                    return _driver_path
+            except (OSError, ValueError):
+                pass
+        _driver_path = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+            with open(DRIVER_PATH_CACHE, "w", encoding="utf-8") as f:
+                json.dump({"path": _driver_path, "resolved": datetime.now().isoformat(timespec="seconds")}, f)
+        except OSError:
+            pass
+        print(f"[INFO] Resolved chromedriver: {_driver_path}")
+        return _driver_path
+
+def setup_driver(headless=True, block="off", block_extra=None, allow=None, lean=False, measure_bytes=False,
+                 capture_rpc=False):
+    """
+    Starts Chrome. `block` picks a BLOCK_PRESETS entry applied through CDP,
+    `lean` adds LEAN_CHROME_ARGS, and `measure_bytes` / `capture_rpc` turn on the
+    performance log that network_usage() and ReviewRpcCapture read.
+    """
     options = Options()
     if headless:
         options.add_argument("--headless=new")
@@ -37,152 +174,288 @@ def setup_driver(headless=True):
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
+    if lean:
+        for arg in LEAN_CHROME_ARGS:
+            options.add_argument(arg)
     prefs = {"profile.managed_default_content_settings.images": 2}
+    if lean:
+        prefs.update({
+            "profile.default_content_setting_values.notifications": 2,
+            "profile.default_content_setting_values.geolocation": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+        })
     options.add_experimental_option("prefs", prefs)
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    if measure_bytes or capture_rpc:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    try:
+        driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+    except SessionNotCreatedException:
+        # Cached driver no longer matches the installed Chrome: resolve again once.
+        driver = webdriver.Chrome(service=Service(chromedriver_path(refresh=True)), options=options)
+
+    patterns = effective_block_list(block, block_extra, allow) if block != "off" or block_extra else []
+    if patterns:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        except Exception as e:
+            print(f"[WARN] Request blocking unavailable: {e}")
+    if capture_rpc:
+        try:
+            # Keeps response bodies available to Network.getResponseBody
+            driver.execute_cdp_cmd("Network.enable", {})
+        except Exception as e:
+            print(f"[WARN] Review RPC capture unavailable: {e}")
+    return driver
 
-def dismiss_consent(driver):
+def drain_performance_log(driver):
+    """
+    Reads and clears the performance log, returning its CDP messages. Byte and
+    request tallies are kept on the driver for network_usage(), so several
+    readers can share the one log.
+    """
     try:
-        WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((
-                By.XPATH,
-                "//button[contains(., 'Accept all') or contains(., 'I agree') or contains(., 'Прийняти всі')]"
-            ))
-        ).click()
-        print("[INFO] Dismissed cookie consent.")
-        time.sleep(2)
-    except:
-        pass
+        entries = driver.get_log("performance")
+    except Exception:
+        return []
+    usage = getattr(driver, "_network_usage", None) or [0, 0, 0]
+    messages = []
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = message.get("method")
+        if method == "Network.loadingFinished":
+            usage[0] += int(message["params"].get("encodedDataLength", 0))
+            usage[1] += 1
+        elif method == "Network.loadingFailed" and message["params"].get("blockedReason"):
+            usage[2] += 1
+        messages.append(message)
+    driver._network_usage = usage
+    return messages
 
-def click_reviews_button(driver):
-    wait = WebDriverWait(driver, 4)
-    possible_xpaths = [
-        "//button[contains(., 'Відгуки')]",
-        "//button[contains(., 'Reviews')]",
-        "//button[contains(., 'All reviews')]",
-        "//button[@aria-label='All reviews']",
-        "//div[contains(@aria-label, 'Відгуки') or contains(@aria-label, 'Reviews')]",
-    ]
-    start_time = time.time()
-    for xpath in possible_xpaths:
+def network_usage(driver):
+    """
+    Returns (bytes received, requests finished, requests blocked) since the
+    previous call. Needs setup_driver(measure_bytes=True).
+    """
+    drain_performance_log(driver)
+    usage = getattr(driver, "_network_usage", None) or [0, 0, 0]
+    driver._network_usage = [0, 0, 0]
+    return tuple(usage)
+
+# ---------- page readiness ----------
+POLL_INTERVAL = 0.1          # seconds between readiness checks (one script round trip each)
+PAGE_READY_TIMEOUT = 10
+REVIEWS_TAB_TIMEOUT = 6
+CONSENT_XPATHS = [
+    "//button[contains(., 'Accept all') or contains(., 'I agree') or contains(., 'Прийняти всі')]",
+]
+REVIEWS_TAB_XPATHS = [
+    "//button[contains(., 'Відгуки')]",
+    "//button[contains(., 'Reviews')]",
+    "//button[contains(., 'All reviews')]",
+    "//button[@aria-label='All reviews']",
+    "//div[contains(@aria-label, 'Відгуки') or contains(@aria-label, 'Reviews')]",
+]
+
+# First visible, enabled element matching any of the XPaths (in list order), or null.
+FIRST_VISIBLE_JS = """
+for (const xp of arguments[0]) {
+  const r = document.evaluate(xp, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (let i = 0; i < r.snapshotLength; i++) {
+    const el = r.snapshotItem(i);
+    if (el.getClientRects().length && !el.disabled) return el;
+  }
+}
+return null;
+"""
+
+# Races the consent dialog against the place heading: returns 'place' once the
+# heading has text; clicks a consent button once (marking it) and reports 'consent',
+# then keeps returning null while that dialog goes away; else null.
+PAGE_STATE_JS = """
+const h1 = document.querySelector('h1.DUwDvf');
+if (h1 && (h1.innerText || '').trim()) return 'place';
+for (const xp of arguments[0]) {
+  const el = document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  if (el && el.getClientRects().length) {
+    if (el.dataset.scraperClicked) return null;
+    el.dataset.scraperClicked = '1';
+    el.click();
+    return 'consent';
+  }
+}
+return null;
+"""
+
+def wait_for_place_page(driver, timeout=PAGE_READY_TIMEOUT):
+    """
+    Waits until a freshly loaded place page has its heading, dismissing the cookie
+    consent dialog on the way if it shows up. The consent cookie then lives in the
+    browser, so a reused session goes straight to the heading on later places.
+    Returns True when the page is ready.
+    """
+    deadline = time.time() + timeout
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
         try:
-            button = wait.until(EC.element_to_be_clickable((By.XPATH, xpath)))
-            driver.execute_script("arguments[0].click();", button)
-            print(f"[INFO] Clicked 'Reviews' tab via {xpath} in {time.time() - start_time:.2f}s")
-            WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.m6QErb"))
+            state = WebDriverWait(driver, remaining, poll_frequency=POLL_INTERVAL).until(
+                lambda d: d.execute_script(PAGE_STATE_JS, CONSENT_XPATHS)
             )
+        except TimeoutException:
+            return False
+        if state == "place":
             return True
-        except:
-            continue
-    print(f"[WARN] 'Reviews' tab not found after {time.time() - start_time:.2f}s")
-    return False
+        print("[INFO] Dismissed cookie consent.")
 
-def get_full_place_name(driver):
-    def clean(s):
-        if not s:
-            return ""
-        s = s.replace("\u200b", "").replace("\u200e", "").replace("\u200f", "")
-        s = s.strip(" \n\t·-|—–")
-        s = re.sub(r"\s+", " ", s)
-        s = re.sub(r"(…|\.{3})$", "", s).strip()
-        return s
-
-    try:
-        WebDriverWait(driver, 6).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "h1[role='heading'], h1.DUwDvf, h1"))
-        )
-        h1 = driver.find_element(By.CSS_SELECTOR, "h1[role='heading'], h1.DUwDvf, h1")
-        name = clean(h1.text or h1.get_attribute("aria-label") or "")
-        if name and not name.endswith(("…", "...")):
-            return name
-    except:
-        pass
+def dismiss_consent(driver, timeout=5):
+    """Clears the consent dialog if it shows up before the place page is ready."""
+    wait_for_place_page(driver, timeout)
 
+def click_reviews_button(driver, timeout=REVIEWS_TAB_TIMEOUT):
+    """Clicks the Reviews tab, polling every candidate selector at once. Returns True on success."""
+    start_time = time.time()
     try:
-        og = driver.execute_script(
-            "const m=document.querySelector(\"meta[property='og:title']\");"
-            "return m && m.content ? m.content : '';"
-        ) or ""
-        og = clean(og)
-        if og:
-            if " · " in og:
-                og = og.split(" · ")[0].strip()
-            return og
-    except:
-        pass
+        button = WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+            lambda d: d.execute_script(FIRST_VISIBLE_JS, REVIEWS_TAB_XPATHS)
+        )
+    except TimeoutException:
+        print(f"[WARN] 'Reviews' tab not found after {time.time() - start_time:.2f}s")
+        return False
+    driver.execute_script("arguments[0].click();", button)
+    print(f"[INFO] Clicked 'Reviews' tab in {time.time() - start_time:.2f}s")
+    try:
+        WebDriverWait(driver, 5, poll_frequency=POLL_INTERVAL).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div.jftiEf"))
+        )
+    except TimeoutException:
+        pass  # a place without reviews; scrape_reviews() finds the panel on its own
+    return True
+
+# ---------- place metadata ----------
+# Everything the place parsers need, read in one round trip.
+PLACE_META_JS = """
+const text = (sel) => {
+  const e = document.querySelector(sel);
+  return e ? (e.innerText || e.textContent || '').trim() : '';
+};
+const attr = (sel, name) => {
+  const e = document.querySelector(sel);
+  return e ? (e.getAttribute(name) || '') : '';
+};
+const h1 = document.querySelector("h1[role='heading'], h1.DUwDvf, h1");
+return {
+  heading: text('h1.DUwDvf'),
+  any_heading: h1 ? ((h1.innerText || '').trim() || h1.getAttribute('aria-label') || '') : '',
+  category: text('button.DkEaL'),
+  addresses: [text("button[data-item-id='address']"), text('span.UsdlK'), text('div.LrzXr')],
+  og_title: attr("meta[property='og:title']", 'content'),
+  og_image: attr("meta[property='og:image']", 'content'),
+  canonical: (document.querySelector("link[rel='canonical']") || {}).href || '',
+  url: location.href,
+  title: document.title,
+};
+"""
 
+def read_place_meta(driver):
+    """Raw metadata payload from PLACE_META_JS, or {} if the script fails."""
     try:
-        t = clean(driver.title)
-        if t:
-            t = re.sub(r"\s*[·\-\|]\s*Google Maps.*$", "", t, flags=re.IGNORECASE).strip()
-            return t
-    except:
-        pass
+        return driver.execute_script(PLACE_META_JS) or {}
+    except Exception:
+        return {}
+
+def clean_place_name(s):
+    if not s:
+        return ""
+    s = s.replace("\u200b", "").replace("\u200e", "").replace("\u200f", "")
+    s = s.strip(" \n\t·-|—–")
+    s = re.sub(r"\s+", " ", s)
+    s = re.sub(r"(…|\.{3})$", "", s).strip()
+    return s
+
+def place_name_from_meta(meta):
+    """Full place name: the heading unless truncated, else og:title, else the page title."""
+    name = clean_place_name(meta.get("any_heading"))
+    if name and not name.endswith(("…", "...")):
+        return name
+
+    og = clean_place_name(meta.get("og_title"))
+    if og:
+        if " · " in og:
+            og = og.split(" · ")[0].strip()
+        return og
+
+    t = clean_place_name(meta.get("title"))
+    if t:
+        t = re.sub(r"\s*[·\-\|]\s*Google Maps.*$", "", t, flags=re.IGNORECASE).strip()
+        return t
 
     return ""
 
-# --- NEW: coordinate extractor ---
-def get_coordinates(driver):
+def coordinates_from_meta(meta):
     """Returns (lat, lng) or (None, None)."""
     # 1) try @lat,lng in current URL
-    try:
-        url = driver.current_url or ""
-        m = re.search(r'@(-?\d+\.\d+),(-?\d+\.\d+),', url)
-        if m:
-            return float(m.group(1)), float(m.group(2))
-    except:
-        pass
+    m = re.search(r'@(-?\d+\.\d+),(-?\d+\.\d+),', meta.get("url") or "")
+    if m:
+        return float(m.group(1)), float(m.group(2))
 
     # 2) try og:image center=lat,lng
     try:
-        og_img = driver.execute_script(
-            "const m=document.querySelector(\"meta[property='og:image']\");"
-            "return m && m.content ? m.content : '';"
-        ) or ""
+        og_img = meta.get("og_image") or ""
         if og_img:
             qs = parse_qs(urlparse(og_img).query)
             if "center" in qs and qs["center"]:
                 parts = unquote(qs["center"][0]).split(",")
                 if len(parts) == 2:
                     return float(parts[0]), float(parts[1])
-    except:
+    except ValueError:
         pass
 
     # 3) fallback: canonical URL with @lat,lng
-    try:
-        canon = driver.execute_script(
-            "const l=document.querySelector(\"link[rel='canonical']\");return l && l.href ? l.href : '';"
-        ) or ""
-        m2 = re.search(r'@(-?\d+\.\d+),(-?\d+\.\d+),', canon)
-        if m2:
-            return float(m2.group(1)), float(m2.group(2))
-    except:
-        pass
+    m2 = re.search(r'@(-?\d+\.\d+),(-?\d+\.\d+),', meta.get("canonical") or "")
+    if m2:
+        return float(m2.group(1)), float(m2.group(2))
 
     return None, None
 
+def get_full_place_name(driver):
+    return place_name_from_meta(read_place_meta(driver))
+
+def get_coordinates(driver):
+    """Returns (lat, lng) or (None, None)."""
+    return coordinates_from_meta(read_place_meta(driver))
+
+RATING_SELECTORS = [
+    "span[aria-label*='stars']",
+    "span[aria-label*='Rated']",
+    "span[aria-label*='Оцінка']",      # uk
+    "span[aria-label*='рейтинг']",     # uk/ru
+    "span[aria-label*='зв']",          # ru: звезды/звездами
+    "span[aria-label*='estrellas']",   # es
+]
+RATING_IMG_KEYWORDS = ["star", "зір", "звезд", "оцінк", "rate"]
+
+def parse_rating_label(text):
+    m = re.search(r"(\d+(?:[.,]\d+)?)", text or "")
+    return m.group(1).replace(",", ".") if m else ""
+
 def get_review_rating(review):
     """
     Tries multiple locale-safe selectors and pulls the number from aria-label/text.
     Returns a string like '4.0' or '' if not found.
     """
-    candidates = [
-        "span[aria-label*='stars']",
-        "span[aria-label*='Rated']",
-        "span[aria-label*='Оцінка']",      # uk
-        "span[aria-label*='рейтинг']",     # uk/ru
-        "span[aria-label*='зв']",          # ru: звезды/звездами
-        "span[aria-label*='estrellas']",   # es
-    ]
-    for sel in candidates:
+    for sel in RATING_SELECTORS:
         try:
             els = review.find_elements(By.CSS_SELECTOR, sel)
             if els:
                 text = (els[0].get_attribute("aria-label") or els[0].text or "").strip()
-                m = re.search(r"(\d+(?:[.,]\d+)?)", text)
-                if m:
-                    return m.group(1).replace(",", ".")
+                rating = parse_rating_label(text)
+                if rating:
+                    return rating
         except:
             pass
 
@@ -191,242 +464,1903 @@ def get_review_rating(review):
         els = review.find_elements(By.CSS_SELECTOR, "[role='img'][aria-label]")
         for el in els:
             txt = (el.get_attribute("aria-label") or "").lower()
-            if any(k in txt for k in ["star", "зір", "звезд", "оцінк", "rate"]):
-                m = re.search(r"(\d+(?:[.,]\d+)?)", txt)
-                if m:
-                    return m.group(1).replace(",", ".")
+            if any(k in txt for k in RATING_IMG_KEYWORDS):
+                rating = parse_rating_label(txt)
+                if rating:
+                    return rating
     except:
         pass
 
     return ""
 
-# ---------- page parsers ----------
-def collect_place_info(driver):
-    wait = WebDriverWait(driver, 10)
-    info = {}
+# ---------- review card extraction ----------
+# One async script: expands every "More" button, waits a tick for the text to
+# re-render, then returns the raw fields of all cards from `offset` on as a JSON array.
+# Mirrors the selectors used by extract_review_card() below.
+EXTRACT_REVIEWS_JS = """
+const done = arguments[arguments.length - 1];
+const ratingSelectors = arguments[0];
+const imgKeywords = arguments[1];
+const offset = arguments[2] || 0;
+const cards = Array.from(document.querySelectorAll('div.jftiEf')).slice(offset);
+let clicked = 0;
+for (const c of cards) {
+  const more = c.querySelector('button.LkLjZd.ScJHi.OzU4dc');
+  if (more) { more.click(); clicked++; }
+}
+const text = (c, sel) => {
+  const e = c.querySelector(sel);
+  return e ? (e.innerText || e.textContent || '').trim() : '';
+};
+const rating = (c) => {
+  for (const sel of ratingSelectors) {
+    const e = c.querySelector(sel);
+    if (e) {
+      const t = (e.getAttribute('aria-label') || e.innerText || '').trim();
+      if (/\\d/.test(t)) return t;
+    }
+  }
+  for (const e of c.querySelectorAll("[role='img'][aria-label]")) {
+    const t = (e.getAttribute('aria-label') || '').toLowerCase();
+    if (imgKeywords.some(k => t.includes(k)) && /\\d/.test(t)) return t;
+  }
+  return '';
+};
+setTimeout(() => done(cards.map(c => ({
+  author: text(c, 'div.d4r55') || text(c, 'span.X5PpBb') || null,
+  rating: rating(c),
+  date: text(c, 'span.rsqaWe'),
+  content: text(c, 'span.wiI7pd'),
+}))), clicked ? 100 : 0);
+"""
+
+def extract_reviews_batch(driver, offset=0):
+    """Returns raw card dicts for loaded cards from `offset` on in one WebDriver round trip, or None on failure."""
+    try:
+        cards = driver.execute_async_script(EXTRACT_REVIEWS_JS, RATING_SELECTORS, RATING_IMG_KEYWORDS, offset)
+    except Exception as e:
+        print(f"[WARN] Batch review extraction failed, using per-element path: {e}")
+        return None
+    if not isinstance(cards, list):
+        return None
+    return [
+        {
+            "author": c.get("author"),
+            "rating": parse_rating_label(c.get("rating")),
+            "date": c.get("date") or "",
+            "content": c.get("content") or "",
+        }
+        for c in cards
+    ]
 
+def extract_review_card(driver, review):
+    """Per-element fallback: reads one card with individual find_element calls."""
     try:
-        name_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1.DUwDvf")))
-        name = (name_elem.text or "").strip()
+        author = review.find_element(By.CSS_SELECTOR, 'div.d4r55').text
     except:
-        name = ""
-    if not name or name.endswith(("…", "...")):
-        name = get_full_place_name(driver)
-    info["Name"] = name or ""
+        try:
+            author = review.find_element(By.CSS_SELECTOR, 'span.X5PpBb').text
+        except:
+            author = None
+
+    rating = get_review_rating(review)
 
     try:
-        category_elem = driver.find_element(By.CSS_SELECTOR, "button.DkEaL")
-        info["Category"] = category_elem.text.strip()
+        date_text = review.find_element(By.CSS_SELECTOR, "span.rsqaWe").text.strip()
     except:
-        info["Category"] = ""
+        date_text = ""
 
     try:
-        address_elem = driver.find_element(By.XPATH, "//button[@data-item-id='address']")
-        info["Address"] = address_elem.text.strip()
+        read_more = review.find_element(By.CSS_SELECTOR, "button.LkLjZd.ScJHi.OzU4dc")
+        driver.execute_script("arguments[0].click();", read_more)
+        time.sleep(0.1)
     except:
-        try:
-            address_elem = driver.find_element(By.CSS_SELECTOR, "span.UsdlK")
-            info["Address"] = address_elem.text.strip()
-        except:
+        pass
+
+    try:
+        content = review.find_element(By.CSS_SELECTOR, "span.wiI7pd").text.strip()
+    except:
+        content = ""
+
+    return {"author": author, "rating": rating, "date": date_text, "content": content}
+
+def extract_new_cards(driver, offset, batch=True):
+    """Raw card dicts for cards appended after the first `offset` ones."""
+    cards = extract_reviews_batch(driver, offset) if batch else None
+    if cards is None:
+        reviews = driver.find_elements(By.CSS_SELECTOR, "div.jftiEf")[offset:]
+        cards = [extract_review_card(driver, review) for review in reviews]
+    return cards
+
+# ---------- review loading ----------
+SCROLL_IDLE_TIMEOUT = 3.0   # seconds without new cards before a round counts as stagnant
+SCROLL_SETTLE_MS = 250      # debounce after the last appended card before returning
+MAX_STAGNANT_ROUNDS = 3
+
+# Scrolls the panel and resolves as soon as new cards are appended (MutationObserver),
+# instead of sleeping a fixed time and re-querying every card.
+WAIT_FOR_CARDS_JS = """
+const container = arguments[0];
+const known = arguments[1];
+const timeoutMs = arguments[2];
+const settleMs = arguments[3];
+const done = arguments[arguments.length - 1];
+const count = () => document.querySelectorAll('div.jftiEf').length;
+if (count() > known) { done(count()); return; }
+let finished = false, settle = null;
+const finish = () => {
+  if (finished) return;
+  finished = true;
+  obs.disconnect();
+  clearTimeout(timer);
+  clearTimeout(settle);
+  done(count());
+};
+const isCard = (n) => n.nodeType === 1 && (n.matches('div.jftiEf') || n.querySelector('div.jftiEf'));
+const obs = new MutationObserver((records) => {
+  for (const r of records) {
+    for (const n of r.addedNodes) {
+      if (isCard(n)) {
+        clearTimeout(settle);
+        settle = setTimeout(finish, settleMs);
+        return;
+      }
+    }
+  }
+});
+obs.observe(container, {childList: true, subtree: true});
+const timer = setTimeout(finish, timeoutMs);
+container.scrollTop = container.scrollHeight;
+"""
+
+def wait_for_new_cards(driver, scrollable, known):
+    """Scrolls once and waits for cards beyond `known` to appear. Returns the loaded card count."""
+    try:
+        return driver.execute_async_script(
+            WAIT_FOR_CARDS_JS, scrollable, known, int(SCROLL_IDLE_TIMEOUT * 1000), SCROLL_SETTLE_MS
+        )
+    except Exception:
+        for _ in range(5):
+            driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", scrollable)
+            time.sleep(0.2)
+        return len(driver.find_elements(By.CSS_SELECTOR, "div.jftiEf"))
+
+# Removes cards that have already been read from the panel, keeping the last few so
+# the list keeps its scroll height and the next page still loads. Returns the count removed.
+PRUNE_CARDS_JS = """
+const processed = arguments[0];
+const keep = arguments[1];
+const cards = document.querySelectorAll('div.jftiEf');
+const n = Math.max(0, Math.min(processed, cards.length - keep));
+for (let i = 0; i < n; i++) cards[i].remove();
+return n;
+"""
+PRUNE_KEEP = 5
+
+def prune_cards(driver, processed):
+    """Drops the first `processed` loaded cards (minus PRUNE_KEEP) from the DOM. Returns how many went."""
+    try:
+        return driver.execute_script(PRUNE_CARDS_JS, processed, PRUNE_KEEP) or 0
+    except Exception as e:
+        print(f"[WARN] Could not prune review cards: {e}")
+        return 0
+
+def review_fingerprint(author, content):
+    """
+    Stable id for a review card: hash of author + full text. The relative date
+    ("2 weeks ago") drifts between runs, so it is deliberately left out.
+    """
+    norm = lambda v: re.sub(r"\s+", " ", (v or "").strip().lower())
+    return hashlib.sha1(f"{norm(author)}\x1f{norm(content)}".encode("utf-8")).hexdigest()[:20]
+
+def sort_reviews_newest(driver):
+    """Switches the reviews panel to 'Newest' order. Returns True on success."""
+    try:
+        first_card = driver.find_elements(By.CSS_SELECTOR, "div.jftiEf")[:1]
+        WebDriverWait(driver, 5).until(EC.element_to_be_clickable((
+            By.CSS_SELECTOR,
+            "button[aria-label*='Sort'], button[aria-label*='Сортувати'], "
+            "button[aria-label*='Упорядкувати'], button[aria-label*='Сортировать'], button[data-value='Sort']"
+        ))).click()
+        # Menu order: Most relevant, Newest, Highest rating, Lowest rating
+        options = WebDriverWait(driver, 5).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div[role='menuitemradio']"))
+        )
+        if len(options) < 2:
+            return False
+        driver.execute_script("arguments[0].click();", options[1])
+        if first_card:
             try:
-                address_elem = driver.find_element(By.CSS_SELECTOR, "div.LrzXr")
-                info["Address"] = address_elem.text.strip()
+                WebDriverWait(driver, 5).until(EC.staleness_of(first_card[0]))
             except:
-                info["Address"] = ""
+                pass
+        print("[INFO] Sorted reviews by newest.")
+        return True
+    except:
+        print("[WARN] Could not sort reviews by newest.")
+        return False
+
+# ---------- review RPC capture ----------
+# The reviews panel pages through background requests; their JSON (behind an
+# anti-XSSI ")]}'" prefix) holds every review with its full, untruncated text.
+REVIEW_RPC_URLS = ("/maps/rpc/listugcposts", "/maps/preview/review/listentitiesreviews")
+RPC_PREFIX = ")]}'"
+
+# Where each field sits in a review entry, per known response layout. The first
+# layout whose entries all yield an author and a 1-5 rating is used.
+REVIEW_RPC_LAYOUTS = [
+    {   # listugcposts
+        "list": (2,), "entry": (0,), "id": (0,), "author": (1, 4, 5, 0), "rating": (2, 0, 0),
+        "content": (2, 15, 0, 0), "date": (1, 6), "timestamp": (1, 2),
+    },
+    {   # listentitiesreviews (older pages)
+        "list": (2,), "entry": (), "id": (10,), "author": (0, 1), "rating": (4,),
+        "content": (3,), "date": (1,), "timestamp": (27,),
+    },
+]
 
-    # NEW: coordinates
-    lat, lng = get_coordinates(driver)
+def _dig(value, path):
+    for i in path:
+        if not isinstance(value, list) or i >= len(value):
+            return None
+        value = value[i]
+    return value
+
+def rpc_timestamp_to_date(value):
+    """Epoch seconds, ms or us -> 'YYYY-MM-DD', or None."""
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+        return None
+    while value > 1e11:
+        value /= 1000
+    try:
+        return datetime.fromtimestamp(value).strftime("%Y-%m-%d")
+    except (OverflowError, OSError, ValueError):
+        return None
+
+def parse_review_payload(body):
+    """
+    Raw card dicts from one review-list response, in page order, or None if the
+    body matches no known layout. Cards carry a 'published' date when the
+    payload has a timestamp.
+    """
+    text = (body or "").lstrip()
+    if text.startswith(RPC_PREFIX):
+        text = text[len(RPC_PREFIX):]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    for layout in REVIEW_RPC_LAYOUTS:
+        entries = _dig(data, layout["list"])
+        if not isinstance(entries, list):
+            continue
+        cards = []
+        for item in entries:
+            entry = _dig(item, layout["entry"])
+            author = _dig(entry, layout["author"])
+            rating = _dig(entry, layout["rating"])
+            if not isinstance(author, str) or not isinstance(rating, int) or not 1 <= rating <= 5:
+                cards = None
+                break
+            content = _dig(entry, layout["content"])
+            date = _dig(entry, layout["date"])
+            cards.append({
+                "id": _dig(entry, layout["id"]),
+                "author": author,
+                "rating": str(rating),
+                "date": date if isinstance(date, str) else "",
+                "content": content.strip() if isinstance(content, str) else "",
+                "published": rpc_timestamp_to_date(_dig(entry, layout["timestamp"])),
+            })
+        if cards is not None:
+            return cards
+    return None
+
+class ReviewRpcCapture:
+    """
+    Picks review-list responses out of the performance log and reads their
+    bodies over CDP, so cards never have to be read from the DOM or expanded
+    with "More". Needs setup_driver(capture_rpc=True).
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.pending = set()
+        self.seen_ids = set()
+        self.failed = False
+
+    def reset(self):
+        """Drops responses captured so far (e.g. before re-sorting the panel)."""
+        drain_performance_log(self.driver)
+        self.pending.clear()
+        self.seen_ids.clear()
+
+    def _body(self, request_id):
+        try:
+            result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return None
+        body = result.get("body", "")
+        if result.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", "replace")
+        return body
+
+    def poll(self):
+        """Cards from review responses finished since the last call. Sets `failed` on an unparseable one."""
+        cards = []
+        for message in drain_performance_log(self.driver):
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                url = params.get("response", {}).get("url", "")
+                if any(marker in url for marker in REVIEW_RPC_URLS):
+                    self.pending.add(params.get("requestId"))
+            elif method == "Network.loadingFinished" and params.get("requestId") in self.pending:
+                self.pending.discard(params["requestId"])
+                parsed = parse_review_payload(self._body(params["requestId"]))
+                if parsed is None:
+                    self.failed = True
+                    continue
+                metrics.count("rpc_payloads")
+                for card in parsed:
+                    if card["id"] and card["id"] in self.seen_ids:
+                        continue
+                    self.seen_ids.add(card["id"])
+                    cards.append(card)
+        return cards
+
+# ---------- page parsers ----------
+def collect_place_info(driver):
+    """Name, category, address and coordinates from one PLACE_META_JS round trip."""
+    # The heading is normally already there (wait_for_place_page), so the wait only covers stragglers.
+    try:
+        meta = WebDriverWait(driver, 2, poll_frequency=POLL_INTERVAL).until(
+            lambda d: (lambda m: m if m.get("heading") else None)(read_place_meta(d))
+        )
+    except TimeoutException:
+        meta = read_place_meta(driver)
+
+    info = {}
+    name = meta.get("heading") or ""
+    if not name or name.endswith(("…", "...")):
+        name = place_name_from_meta(meta)
+    info["Name"] = name or ""
+    info["Category"] = meta.get("category") or ""
+    info["Address"] = next((a for a in meta.get("addresses") or [] if a), "")
+
+    lat, lng = coordinates_from_meta(meta)
     info["Lat"] = lat
     info["Lng"] = lng
 
     return info
 
-def parse_relative_date(text):
-    cleaned_text = text.lower().replace("edited", "").replace("змінено", "").strip()
-    parsed_date = dateparser.parse(
+# ---------- date parsing ----------
+# Relative phrases Google Maps shows for uk/ru/en, e.g. "2 місяці тому", "a year ago", "неделю назад".
+RELATIVE_UNITS = {
+    "year": ["years", "year", "років", "роки", "року", "рік", "лет", "года", "год"],
+    "month": ["months", "month", "місяців", "місяці", "місяця", "місяць", "месяцев", "месяца", "месяц"],
+    "week": ["weeks", "week", "тижнів", "тижні", "тижня", "тиждень", "недель", "недели", "неделю", "неделя"],
+    "day": ["days", "day", "днів", "дні", "дня", "день", "дней"],
+    "hour": ["hours", "hour", "годин", "години", "годину", "година", "часов", "часа", "час"],
+    "minute": ["minutes", "minute", "хвилин", "хвилини", "хвилину", "минут", "минуты", "минуту"],
+}
+UNIT_BY_WORD = {word: unit for unit, words in RELATIVE_UNITS.items() for word in words}
+RELATIVE_DATE_RE = re.compile(
+    r"^(?:(\d+|an?|one|один|одна|одну)\s+)?(" + "|".join(sorted(UNIT_BY_WORD, key=len, reverse=True)) +
+    r")\s+(?:ago|тому|назад)$"
+)
+DAY_WORDS = {
+    "today": 0, "сьогодні": 0, "сегодня": 0,
+    "yesterday": 1, "вчора": 1, "учора": 1, "вчера": 1,
+}
+NAMED_OFFSETS = {
+    "just now": ("minute", 0), "щойно": ("minute", 0), "только что": ("minute", 0),
+    "last week": ("week", 1), "минулого тижня": ("week", 1), "на минулому тижні": ("week", 1),
+    "на прошлой неделе": ("week", 1),
+    "last month": ("month", 1), "минулого місяця": ("month", 1), "в прошлом месяце": ("month", 1),
+    "last year": ("year", 1), "минулого року": ("year", 1), "в прошлом году": ("year", 1),
+}
+DATE_CACHE_SIZE = 4096
+
+def shift_months(dt, months):
+    """dt minus `months` calendar months, clamping the day (Mar 31 - 1 month = Feb 28/29)."""
+    y, m = divmod(dt.year * 12 + dt.month - 1 - months, 12)
+    m += 1
+    days_in_month = (datetime(y + m // 12, m % 12 + 1, 1) - timedelta(days=1)).day
+    return dt.replace(year=y, month=m, day=min(dt.day, days_in_month))
+
+def clean_date_text(text):
+    cleaned = text.lower()
+    for marker in ("edited", "змінено", "изменено"):
+        cleaned = cleaned.replace(marker, "")
+    return re.sub(r"\s+", " ", cleaned).strip(" ,·")
+
+def match_date_rule(cleaned_text):
+    """Returns ('ago', unit, n) for a known relative phrase, else None."""
+    if cleaned_text in DAY_WORDS:
+        return ("ago", "day", DAY_WORDS[cleaned_text])
+    if cleaned_text in NAMED_OFFSETS:
+        return ("ago", *NAMED_OFFSETS[cleaned_text])
+    m = RELATIVE_DATE_RE.match(cleaned_text)
+    if not m:
+        return None
+    amount = m.group(1)
+    n = int(amount) if amount and amount.isdigit() else 1
+    return ("ago", UNIT_BY_WORD[m.group(2)], n)
+
+def apply_date_rule(rule, now):
+    kind, unit, n = rule
+    if kind == "abs":
+        return unit
+    if kind == "dynamic":
+        return parse_date_with_dateparser(unit, now)
+    if unit == "year":
+        return shift_months(now, 12 * n)
+    if unit == "month":
+        return shift_months(now, n)
+    if unit == "week":
+        return now - timedelta(weeks=n)
+    if unit == "day":
+        return now - timedelta(days=n)
+    if unit == "hour":
+        return now - timedelta(hours=n)
+    return now - timedelta(minutes=n)
+
+def parse_date_with_dateparser(cleaned_text, now):
+    return dateparser.parse(
         cleaned_text,
         settings={
-            "RELATIVE_BASE": datetime.now(),
+            "RELATIVE_BASE": now,
             "PREFER_DATES_FROM": "past",
             "DATE_ORDER": "DMY"
         },
         languages=["uk", "ru", "en"]
     )
 
-    if not parsed_date:
-        now = datetime.now()
-        if "рік тому" in cleaned_text or "a year ago" in cleaned_text:
-            parsed_date = now - timedelta(days=365)
-        elif re.search(r"\d+\s+роки? тому", cleaned_text):
-            years = int(re.search(r"\d+", cleaned_text).group())
-            parsed_date = now - timedelta(days=365 * years)
-        elif "місяць тому" in cleaned_text or "a month ago" in cleaned_text:
-            parsed_date = now - timedelta(days=30)
-        elif re.search(r"\d+\s+місяц[яів]+ тому", cleaned_text):
-            months = int(re.search(r"\d+", cleaned_text).group())
-            parsed_date = now - timedelta(days=30 * months)
-        elif "тиждень тому" in cleaned_text or "a week ago" in cleaned_text:
-            parsed_date = now - timedelta(weeks=1)
-        elif re.search(r"\d+\s+тижн[яів]+ тому", cleaned_text):
-            weeks = int(re.search(r"\d+", cleaned_text).group())
-            parsed_date = now - timedelta(weeks=weeks)
-        elif "день тому" in cleaned_text or "a day ago" in cleaned_text:
-            parsed_date = now - timedelta(days=1)
-        elif re.search(r"\d+\s+дн[яів]+ тому", cleaned_text):
-            days = int(re.search(r"\d+", cleaned_text).group())
-            parsed_date = now - timedelta(days=days)
-
-    return parsed_date.strftime("%Y-%m-%d") if parsed_date else "Unknown"
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def resolve_date_text(cleaned_text):
+    """
+    Cached text -> rule lookup. Relative phrases are stored as offsets rather than
+    dates, so cached entries stay correct as the clock moves. dateparser only runs
+    on a miss of both the cache and the rule table; if its answer depends on the
+    base date ("just now", "5 лютого"), the phrase is re-parsed on every use.
+    """
+    rule = match_date_rule(cleaned_text)
+    if rule:
+        return rule
+    now = datetime.now()
+    parsed = parse_date_with_dateparser(cleaned_text, now)
+    if not parsed:
+        return None
+    if parse_date_with_dateparser(cleaned_text, now - timedelta(days=400)) != parsed:
+        return ("dynamic", cleaned_text, None)
+    return ("abs", parsed, None)
+
+def parse_relative_date(text):
+    rule = resolve_date_text(clean_date_text(text))
+    if not rule:
+        return "Unknown"
+    return apply_date_rule(rule, datetime.now()).strftime("%Y-%m-%d")
 
 # NEW: include lat/lng in each record
-def scrape_reviews(driver, max_reviews, institution_name, city, organization, lat, lng):
+def scrape_reviews(driver, max_reviews, institution_name, city, organization, lat, lng, batch=True,
+                   known_fingerprints=None, rpc=None, dedup=None, window=0, flush=None, time_limit=300):
+    """
+    With known_fingerprints (a set), runs in incremental mode: reviews are sorted
+    newest first and loading stops at the first review already in storage.
+    With dedup (a ReviewIndex), reviews already stored by any run or place are
+    skipped as they are extracted; they still count towards max_reviews.
+    With rpc (a ReviewRpcCapture), cards are read from the review responses and
+    the DOM is only used to trigger loading, unless no response can be parsed.
+    With window and flush, memory stays flat however many reviews a place has:
+    every `window` reviews are handed to flush(reviews) and dropped, and cards
+    already read are removed from the page. If the page dies, the reviews
+    extracted so far are flushed before the error propagates.
+    Loading stops after time_limit seconds (0 = no limit).
+    Returns (reviews not flushed yet, review cards seen, timed out); the card count
+    tells a page without reviews from one whose reviews were all skipped or flushed.
+    """
     wait = WebDriverWait(driver, 15)
-    reviews = []
-    try:
-        scrollable = wait.until(EC.presence_of_element_located(
-            (By.CSS_SELECTOR, "div.m6QErb.DxyBCb.kA9KIf.dS8AEf.XiKgde")
-        ))
-    except:
-        scrollable = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.m6QErb")))
+    with metrics.phase("reviews_panel"):
+        try:
+            scrollable = wait.until(EC.presence_of_element_located(
+                (By.CSS_SELECTOR, "div.m6QErb.DxyBCb.kA9KIf.dS8AEf.XiKgde")
+            ))
+        except:
+            scrollable = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.m6QErb")))
 
     print("[INFO] Located scrollable reviews container.")
 
+    incremental = known_fingerprints is not None
+    if incremental:
+        if rpc:
+            rpc.reset()
+        with metrics.phase("sort"):
+            sorted_ok = sort_reviews_newest(driver)
+        if not sorted_ok:
+            # Without newest-first order an old review can appear before new ones.
+            known_fingerprints = set()
+
     stagnant_scrolls = 0
     start_time = time.time()
+    processed = 0
+    seen_cards = 0
+    data = []
+    flushed = 0
+    emitted = set()
+    duplicates = 0
+    reached_known = False
+    timed_out = False
 
-    while len(reviews) < max_reviews and (time.time() - start_time) < 300:
-        last_height = driver.execute_script("return arguments[0].scrollHeight", scrollable)
-        for _ in range(5):
-            driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", scrollable)
-            time.sleep(0.2)
-        new_reviews = driver.find_elements(By.CSS_SELECTOR, "div.jftiEf")
-
-        if len(new_reviews) == len(reviews):
-            stagnant_scrolls += 1
-        else:
+    try:
+        while not reached_known and flushed + len(data) + duplicates < max_reviews:
+            if time_limit and time.time() - start_time >= time_limit:
+                print(f"[WARN] Stopped loading reviews after {time_limit}s with {flushed + len(data)} collected.")
+                timed_out = True
+                break
+            with metrics.phase("load"):
+                loaded = wait_for_new_cards(driver, scrollable, processed)
+            metrics.count("scroll_rounds")
+            if loaded <= processed:
+                stagnant_scrolls += 1
+                metrics.count("stagnant_rounds")
+                if stagnant_scrolls >= MAX_STAGNANT_ROUNDS:
+                    print("[INFO] No more reviews are loading.")
+                    break
+                continue
             stagnant_scrolls = 0
 
-        reviews = new_reviews
-        if stagnant_scrolls > 15:
-            print("[INFO] No more reviews are loading.")
-            break
+            with metrics.phase("extract"):
+                new_cards = rpc.poll() if rpc else []
+                if rpc and (rpc.failed or not new_cards):
+                    print("[WARN] Review responses could not be parsed, reading cards from the DOM.")
+                    rpc = None
+                    processed = 0  # re-read every loaded card; ones already taken are skipped below
+                if rpc:
+                    processed = loaded
+                else:
+                    new_cards = extract_new_cards(driver, processed, batch)
+                    processed = processed + len(new_cards) if new_cards else loaded
+            metrics.count("cards", len(new_cards))
+            seen_cards += len(new_cards)
+            for card in new_cards:
+                fingerprint = review_fingerprint(card["author"], card["content"])
+                if fingerprint in emitted:
+                    continue
+                emitted.add(fingerprint)
+                if incremental and fingerprint in known_fingerprints:
+                    print(f"[INFO] Reached an already stored review after {flushed + len(data)} new ones.")
+                    reached_known = True
+                    break
+                if dedup and dedup.seen(review_key(organization, fingerprint)):
+                    duplicates += 1
+                    metrics.count("duplicates")
+                    if flushed + len(data) + duplicates >= max_reviews:
+                        break
+                    continue
 
-    if not reviews:
-        return []
+                with metrics.phase("parse_dates"):
+                    date = card.get("published") or (parse_relative_date(card["date"]) if card["date"] else "Unknown")
+                content = card["content"]
 
-    data = []
-    for review in reviews:
-        try:
-            author = review.find_element(By.CSS_SELECTOR, 'div.d4r55').text
-        except:
-            try:
-                author = review.find_element(By.CSS_SELECTOR, 'span.X5PpBb').text
-            except:
-                author = None
+                if content and len(content) > 5:
+                    data.append({
+                        "city": city,
+                        "organization": organization,
+                        "author": card["author"],
+                        "date": date,
+                        "rating": card["rating"],
+                        "content": content,
+                        "lat": lat,
+                        "lng": lng,
+                        "fingerprint": fingerprint
+                    })
+
+                if flushed + len(data) >= max_reviews:
+                    break
+
+            if window and flush:
+                if len(data) >= window:
+                    with metrics.phase("write"):
+                        flush(data)
+                    flushed += len(data)
+                    data = []
+                if processed >= window:
+                    with metrics.phase("prune"):
+                        processed -= prune_cards(driver, processed)
+    except Exception:
+        if flush and data:
+            print(f"[WARN] Page failed; saving the {len(data)} reviews extracted so far.")
+            with metrics.phase("write"):
+                flush(data)
+        raise
+
+    return data, seen_cards, timed_out
+
+# ---------- metrics ----------
+METRIC_COUNTERS = ("webdriver_calls", "scroll_rounds", "stagnant_rounds", "cards", "reviews",
+                   "bytes", "requests", "blocked_requests", "rpc_payloads", "duplicates", "throttled")
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+class Metrics:
+    """
+    Per-place phase timers and counters. Each worker thread fills in the record
+    of the place it is working on; finished records are appended to a JSONL
+    file (if one is open) and summarized as p50/p95 per phase at the end.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+        self.records = []
+        self.started = time.time()
 
-        rating = get_review_rating(review)
+    def open(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
 
+    def _current(self):
+        return getattr(self._local, "record", None)
+
+    def start_place(self, idx, url, worker_id):
+        """Starts timing a place; closes the thread's previous record if still open."""
+        self.finish_place()
+        self._local.record = {
+            "idx": idx, "url": url, "worker": worker_id,
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "status": "unknown", "phases": {}, "counters": {},
+        }
+        self._local.t0 = time.perf_counter()
+
+    def set_status(self, status, reason=None):
+        record = self._current()
+        if record is not None:
+            record["status"] = status
+            if reason:
+                record["reason"] = reason
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
         try:
-            date_text = review.find_element(By.CSS_SELECTOR, "span.rsqaWe").text.strip()
-            date = parse_relative_date(date_text)
-        except:
-            date = "Unknown"
+            yield
+        finally:
+            record = self._current()
+            if record is not None:
+                record["phases"][name] = record["phases"].get(name, 0.0) + time.perf_counter() - t0
+
+    def count(self, name, n=1):
+        record = self._current()
+        if record is not None:
+            record["counters"][name] = record["counters"].get(name, 0) + n
+
+    def finish_place(self):
+        record = self._current()
+        if record is None:
+            return
+        self._local.record = None
+        record["total"] = time.perf_counter() - self._local.t0
+        reviews = record["counters"].get("reviews", 0)
+        record["reviews_per_sec"] = reviews / record["total"] if record["total"] > 0 else 0.0
+        with self._lock:
+            self.records.append(record)
+            if self._file:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    def summary(self):
+        """{phase: {count, p50, p95, total}} over scraped places, plus run-level totals."""
+        with self._lock:
+            records = list(self.records)
+        scraped = [r for r in records if r["status"] != "skipped"]
+        series = {}
+        for r in scraped:
+            for name, value in r["phases"].items():
+                series.setdefault(name, []).append(value)
+            series.setdefault("total", []).append(r["total"])
+            for name in METRIC_COUNTERS:
+                series.setdefault(name, []).append(r["counters"].get(name, 0))
+        stats = {
+            name: {"count": len(v), "p50": percentile(v, 50), "p95": percentile(v, 95), "total": sum(v)}
+            for name, v in series.items()
+        }
+        statuses = {}
+        for r in records:
+            statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+        wall = time.time() - self.started
+        reviews = sum(r["counters"].get("reviews", 0) for r in scraped)
+        return {
+            "places": statuses,
+            "wall_seconds": wall,
+            "reviews": reviews,
+            "reviews_per_sec": reviews / wall if wall > 0 else 0.0,
+            "stats": stats,
+        }
+
+    def print_summary(self, path=None):
+        summary = self.summary()
+        print(f"[INFO] Places: {summary['places']}, {summary['reviews']} reviews in "
+              f"{summary['wall_seconds']:.1f}s ({summary['reviews_per_sec']:.2f} reviews/s)")
+        if summary["stats"]:
+            print(f"{'phase':<20} {'n':>5} {'p50':>9} {'p95':>9} {'total':>10}")
+            phases = sorted((n for n in summary["stats"] if n not in METRIC_COUNTERS),
+                            key=lambda n: -summary["stats"][n]["total"])
+            for name in phases + list(METRIC_COUNTERS):
+                st = summary["stats"].get(name)
+                if st:
+                    print(f"{name:<20} {st['count']:>5} {st['p50']:>9.2f} {st['p95']:>9.2f} {st['total']:>10.1f}")
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+metrics = Metrics()
+
+def instrument_driver(driver):
+    """Counts every WebDriver command (find_element, execute_script, ...) toward the current place."""
+    execute = driver.execute
+
+    def counted_execute(*args, **kwargs):
+        metrics.count("webdriver_calls")
+        return execute(*args, **kwargs)
+
+    driver.execute = counted_execute
+    return driver
 
+# ---------- per-place pipeline ----------
+class ScrapeError(Exception):
+    """A place could not be scraped for a reason worth recording (not a browser crash)."""
+
+class PartialScrapeError(ScrapeError):
+    """Loading stopped before the place's last review; `reviews` holds what was collected (and not flushed)."""
+    def __init__(self, message, reviews):
+        super().__init__(message)
+        self.reviews = reviews
+
+class ThrottledError(ScrapeError):
+    """Google answered with a CAPTCHA, a consent wall or another throttling signal; retry later."""
+
+def is_short_url(url):
+    return any(short in url for short in ["goo.gl", "g.co", "maps.app.goo.gl"])
+
+def resolve_url(url):
+    """Expands short links. Raises ScrapeError if a short link does not lead to Google Maps."""
+    if not is_short_url(url):
+        return url
+    expanded_url = expand_google_maps_url(url)
+    if not expanded_url:
+        raise ScrapeError("URL expansion failed")
+    return expanded_url
+
+def scrape_place(driver, url, idx, max_reviews, known_fingerprints=None, batch=True, rpc=False, dedup=None,
+                 window=0, flush=None, time_limit=300):
+    """
+    Scrapes one (already expanded) place URL on an existing driver. Returns a list of reviews (may be empty),
+    or raises PartialScrapeError (carrying the reviews) if loading hit time_limit before the end.
+    Pass known_fingerprints to only collect reviews newer than the ones already stored, and
+    rpc=True (driver started with capture_rpc) to read reviews from the page's review responses,
+    and a ReviewIndex as dedup to drop reviews stored before. With window and flush, reviews are
+    handed to flush() in batches as they load and only the rest is returned (see scrape_reviews).
+    """
+    capture = ReviewRpcCapture(driver) if rpc else None
+    if capture:
+        capture.reset()
+    with metrics.phase("navigate"):
+        driver.get(url)
+    with metrics.phase("page_ready"):
+        if not wait_for_place_page(driver):
+            check_throttled(driver)
+            print("[WARN] Place heading did not appear; reading the page anyway.")
+
+    with metrics.phase("place_info"):
+        place_info = collect_place_info(driver)
+    with metrics.phase("reviews_tab"):
+        found = click_reviews_button(driver)
+    if not found:
+        check_throttled(driver)
+        raise ScrapeError("'Reviews' tab not found")
+
+    with metrics.phase("place_info"):
+        name = place_info.get("Name", "") or get_full_place_name(driver) or "Unknown"
+    organization = name
+    address = place_info.get("Address", "")
+    parts = [part.strip() for part in address.split(",")] if address else []
+    city = parts[-3] if len(parts) >= 3 else "Unknown"
+
+    lat = place_info.get("Lat")
+    lng = place_info.get("Lng")
+
+    # 📌 Print with organization #
+    print(f"[INFO] Organization #{idx}: {organization} ({city}) [{lat}, {lng}]")
+
+    reviews, seen_cards, timed_out = scrape_reviews(
+        driver, max_reviews, name, city, organization, lat, lng, batch=batch,
+        known_fingerprints=known_fingerprints, rpc=capture, dedup=dedup, window=window, flush=flush,
+        time_limit=time_limit,
+    )
+    if not seen_cards and known_fingerprints is None:
+        check_throttled(driver)  # an empty panel can be a soft block
+    if timed_out:
+        raise PartialScrapeError(f"stopped after {time_limit}s", reviews)
+    return reviews
+
+# ---------- throttling ----------
+# Page state used to tell a throttled page from a place that simply has no reviews.
+THROTTLE_STATE_JS = """
+return {
+  url: location.href,
+  text: (document.body ? document.body.innerText : '').slice(0, 3000),
+  captcha: !!document.querySelector("form#captcha-form, #recaptcha, iframe[src*='recaptcha'], div.g-recaptcha"),
+  place: !!document.querySelector('h1.DUwDvf'),
+};
+"""
+
+def check_throttled(driver):
+    """Raises ThrottledError if the current page is a throttling signal."""
+    try:
+        state = driver.execute_script(THROTTLE_STATE_JS) or {}
+    except Exception:
+        return
+    signal = classify_throttle(state.get("url"), state.get("text"), state.get("captcha"), state.get("place"))
+    if signal:
+        raise ThrottledError(signal)
+
+# ---------- work list ----------
+WORKLIST_PATH = os.path.join("all_reviews", "worklist.jsonl")
+
+def build_work_list(urls, ledger=None, workers=16, path=WORKLIST_PATH):
+    """
+    Pre-pass before any browser starts: expands every short link concurrently over
+    one pooled session (cached in the ledger across runs), drops URLs that lead
+    to a place already listed, and writes the result to `path` as JSONL.
+    Returns [(source_url, resolved_url)] in input order.
+    """
+    start = time.time()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(1, workers))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    short = list(dict.fromkeys(u for u in urls if is_short_url(u)))
+    expanded, cached = {}, 0
+    for u in short:
+        hit = ledger.cached_expansion(u) if ledger else None
+        if hit:
+            expanded[u] = hit
+            cached += 1
+    todo = [u for u in short if u not in expanded]
+
+    def expand(u):
+        result = expand_google_maps_url(u, session)
+        if result and ledger:
+            ledger.save_expansion(u, result)
+        return u, result
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            expanded.update(pool.map(expand, todo))
+    session.close()
+
+    work, seen_keys, failed, duplicates = [], set(), 0, 0
+    for u in urls:
+        resolved = expanded.get(u) if is_short_url(u) else u
+        if not resolved:
+            failed += 1
+            if ledger:
+                ledger.mark_failed(u, u, "URL expansion failed")
+            continue
+        key = place_key(resolved)
+        if key in seen_keys:
+            duplicates += 1
+            continue
+        seen_keys.add(key)
+        work.append((u, resolved))
+
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for source, resolved in work:
+                f.write(json.dumps({"source_url": source, "url": resolved, "key": place_key(resolved)},
+                                   ensure_ascii=False) + "\n")
+    print(f"[INFO] Work list: {len(work)} places from {len(urls)} URLs "
+          f"({len(todo)} short links expanded, {cached} cached, {failed} failed, {duplicates} duplicates) "
+          f"in {time.time() - start:.1f}s.")
+    return work
+
+# ---------- worker pool ----------
+def driver_alive(driver):
+    try:
+        driver.current_url
+        return True
+    except:
+        return False
+
+def quit_driver(driver):
+    if driver is None:
+        return
+    try:
+        driver.quit()
+    except:
+        pass
+
+def process_tree_rss(pid):
+    """Resident memory (bytes) of a process and all its descendants, read from /proc (Linux only)."""
+    children = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
         try:
-            read_more = review.find_element(By.CSS_SELECTOR, "button.LkLjZd.ScJHi.OzU4dc")
-            driver.execute_script("arguments[0].click();", read_more)
-            time.sleep(0.1)
-        except:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
             pass
+        stack.extend(children.get(p, []))
+    return total
+
+class BrowserSession:
+    """
+    One worker's Chrome. Started lazily and kept warm across places; between
+    places the tab goes to about:blank so the Maps app is torn down, and the
+    browser is recycled after `recycle_after` places or once chromedriver +
+    Chrome exceed `max_memory_mb`, so throughput does not degrade as Chrome leaks.
+    """
+    def __init__(self, driver_options, recycle_after=0, max_memory_mb=0):
+        self.driver_options = driver_options
+        self.recycle_after = recycle_after
+        self.max_memory_mb = max_memory_mb
+        self.driver = None
+        self.places = 0
+        self._used = False
+
+    def get(self):
+        if self.driver is None:
+            with metrics.phase("driver_start"):
+                self.driver = instrument_driver(setup_driver(**self.driver_options))
+            self.places = 0
+        self._used = True
+        return self.driver
+
+    def alive(self):
+        return self.driver is not None and driver_alive(self.driver)
 
+    def memory_mb(self):
         try:
-            content = review.find_element(By.CSS_SELECTOR, "span.wiI7pd").text.strip()
-        except:
-            content = ""
+            return process_tree_rss(self.driver.service.process.pid) / 2**20
+        except Exception:
+            return 0.0
 
-        if content and len(content) > 5:
-            data.append({
-                "city": city,
-                "organization": organization,
-                "author": author,
-                "date": date,
-                "rating": rating,
-                "content": content,
-                "lat": lat,
-                "lng": lng
-            })
+    def after_place(self):
+        """Resets the tab and recycles the browser if it is due."""
+        if not self._used or self.driver is None:
+            return
+        self._used = False
+        self.places += 1
+        reason = None
+        if self.recycle_after and self.places >= self.recycle_after:
+            reason = f"{self.places} places"
+        elif self.max_memory_mb:
+            mb = self.memory_mb()
+            if mb > self.max_memory_mb:
+                reason = f"{mb:.0f} MB in use"
+        if reason:
+            print(f"[INFO] Recycling browser after {reason}.")
+            self.quit()
+            return
+        try:
+            with metrics.phase("reset"):
+                self.driver.get("about:blank")
+        except Exception:
+            pass
+
+    def quit(self):
+        quit_driver(self.driver)
+        self.driver = None
 
-        if len(data) >= max_reviews:
+# Settings of a scrape job, shared by all workers (see job_settings()).
+JOB_DEFAULTS = {
+    "max_reviews": 30,    # reviews per place
+    "max_attempts": 2,    # tries per place when Chrome crashes
+    "since_last": False,  # refresh completed places with only the reviews added since the last run
+    "recycle_after": 0,   # places per browser before it is restarted (0 = never)
+    "max_memory_mb": 0,   # restart a browser once chromedriver + Chrome exceed this RSS (0 = no limit)
+    "window": 0,          # write reviews every N as they load instead of once per place (0 = per place)
+    "place_timeout": 300, # seconds of review loading per place before it is saved as partial (0 = no limit)
+}
+
+def job_settings(**settings):
+    """JOB_DEFAULTS with the given settings applied; unknown names are an error."""
+    unknown = set(settings) - set(JOB_DEFAULTS)
+    if unknown:
+        raise TypeError(f"unknown job settings: {', '.join(sorted(unknown))}")
+    return {**JOB_DEFAULTS, **settings}
+
+def run_worker(worker_id, tasks, sink, driver_options, job, ledger=None, dedup=None, scheduler=None, on_result=None):
+    """
+    Pulls (idx, url, resolved, attempt) tasks from the shared queue until it is empty.
+    Each worker owns one BrowserSession, reused across places and recycled per the
+    job's recycle_after / max_memory_mb; if Chrome dies, the worker starts a fresh
+    one and puts the URL back on the queue (up to max_attempts tries).
+    Results are handed to sink(idx, url, reviews) as soon as a place is done (or
+    every `window` reviews), and the outcome is recorded in the ledger if one is given.
+    With dedup, reviews already in the index are dropped, and written ones are added to it.
+    on_result(idx, status, review_count, detail) is called after every task.
+    A ThrottleScheduler paces the worker and decides whether throttled places are retried.
+    """
+    session = BrowserSession(driver_options, job["recycle_after"], job["max_memory_mb"])
+    while True:
+        # Wait for a slot before taking a task, so a paused worker holds no lease other hosts could run.
+        if scheduler:
+            scheduler.acquire(worker_id)
+        try:
+            task = tasks.get_nowait()
+        except queue.Empty:
+            if scheduler:
+                scheduler.release(worker_id, None)
             break
+        outcome = ("failed", 0, "worker error")
+        try:
+            outcome = process_task(worker_id, tasks, session, sink, task, job, ledger, dedup, scheduler)
+        except Exception as e:
+            # Output, ledger or dedup index failed (disk full, database locked, ...): report the task
+            # as failed and keep serving the queue rather than letting the thread die.
+            print(f"[ERROR] Worker {worker_id}: #{task[0]} failed: {e!r}")
+            metrics.set_status("failed", repr(e))
+            outcome = ("failed", 0, repr(e))
+        finally:
+            session.after_place()
+            metrics.finish_place()  # before acquire(), so pauses between places are not timed as the place
+            if scheduler:
+                # Skipped places never reached Google and say nothing about throttling.
+                scheduler.release(worker_id, None if outcome[0] == "skipped" else outcome[2] == "throttled")
+        if on_result:
+            try:
+                on_result(task[0], *outcome)
+            except Exception as e:
+                print(f"[WARN] Worker {worker_id}: could not report the result of #{task[0]}: {e!r}")
 
-    return data
+    session.quit()
 
-# ---------- main ----------
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python google-maps-scraper.py <input_file_or_url> [max_reviews] [headless]")
-        sys.exit(1)
+def process_task(worker_id, tasks, session, sink, task, job, ledger=None, dedup=None, scheduler=None):
+    """Scrapes one task. Returns (status, review_count, detail); status is done / partial / skipped / failed / requeued."""
+    idx, url, resolved, attempt = task
+    max_attempts, since_last, window = job["max_attempts"], job["since_last"], job["window"]
+    metrics.start_place(idx, url, worker_id)
+    written = []  # fingerprints of this place's reviews already handed to the sink
 
-    input_arg = sys.argv[1]
-    max_reviews = int(sys.argv[2]) if len(sys.argv) >= 3 else 30
-    headless_mode = not (len(sys.argv) >= 4 and sys.argv[3].lower() == "false")
+    def flush(batch):
+        # Partial batches also reach the dedup index, so a retry after a crash skips them.
+        sink(idx, url, batch)
+        if dedup:
+            dedup.add(review_key(r["organization"], r["fingerprint"]) for r in batch)
+        written.extend(r["fingerprint"] for r in batch)
 
-    if input_arg.endswith(".txt"):
-        with open(input_arg, "r", encoding="utf-8") as f:
-            urls = [line.strip() for line in f if line.strip()]
-    else:
-        urls = [input_arg]
+    if ledger and not since_last and ledger.is_done(url):
+        print(f"[INFO] Skipping #{idx}: already scraped.")
+        metrics.set_status("skipped")
+        return "skipped", 0, None
+
+    measure_bytes = session.driver_options.get("measure_bytes")
+    try:
+        if not resolved:
+            resolved = url
+            with metrics.phase("expand_url"):
+                resolved = resolve_url(url)
+        if ledger and not since_last and resolved != url and ledger.is_done(resolved):
+            print(f"[INFO] Skipping #{idx}: already scraped.")
+            metrics.set_status("skipped")
+            return "skipped", 0, None
+        known = ledger.known_fingerprints(resolved) if ledger and since_last else None
+        driver = session.get()
+        if measure_bytes:
+            network_usage(driver)  # discard traffic from before this place
+        reviews = scrape_place(driver, resolved, idx, job["max_reviews"], known_fingerprints=known,
+                               rpc=session.driver_options.get("capture_rpc", False), dedup=dedup,
+                               window=window, flush=flush if window else None, time_limit=job["place_timeout"])
+        if measure_bytes:
+            received, finished, blocked = network_usage(driver)
+            metrics.count("bytes", received)
+            metrics.count("requests", finished)
+            metrics.count("blocked_requests", blocked)
+    except PartialScrapeError as e:
+        # Not done: the next run retries it, and the dedup index skips what was written now.
+        print(f"[WARN] Worker {worker_id}: #{idx} {e}; saved as partial.")
+        with metrics.phase("write"):
+            if e.reviews:
+                flush(e.reviews)
+            if ledger:
+                ledger.mark_partial(resolved, url, len(written), str(e))
+        metrics.count("reviews", len(written))
+        metrics.set_status("partial", str(e))
+        return "partial", len(written), str(e)
+    except ThrottledError as e:
+        print(f"[WARN] Worker {worker_id}: #{idx} throttled ({e}).")
+        metrics.count("throttled")
+        metrics.set_status("throttled", str(e))
+        session.quit()  # start the next place with a fresh browser
+        if scheduler.should_retry(idx) if scheduler else attempt < max_attempts:
+            tasks.put((idx, url, resolved, attempt if scheduler else attempt + 1))
+            return "requeued", 0, "throttled"
+        if ledger:
+            ledger.mark_failed(resolved, url, f"throttled: {e}")
+        return "failed", 0, "throttled"
+    except ScrapeError as e:
+        print(f"[WARN] Worker {worker_id}: #{idx} skipped: {e}")
+        metrics.set_status("failed", str(e))
+        if ledger:
+            ledger.mark_failed(resolved, url, str(e))
+        return "failed", 0, str(e)
+    except Exception as e:
+        if session.alive():
+            print(f"[ERROR] Worker {worker_id}: #{idx} failed: {e}")
+            metrics.set_status("failed", f"{e.__class__.__name__}: {e}")
+            if ledger:
+                ledger.mark_failed(resolved, url, f"{e.__class__.__name__}: {e}")
+            return "failed", 0, f"{e.__class__.__name__}: {e}"
+        print(f"[WARN] Worker {worker_id}: Chrome crashed on #{idx}, restarting browser"
+              + (f" ({len(written)} reviews were saved before the crash)." if written else "."))
+        metrics.set_status("crashed")
+        session.quit()
+        if attempt < max_attempts:
+            tasks.put((idx, url, resolved, attempt + 1))
+            return "requeued", 0, None
+        print(f"[ERROR] Worker {worker_id}: giving up on #{idx} after {attempt} attempts.")
+        if ledger:
+            ledger.mark_failed(resolved, url, "browser crashed")
+        return "failed", 0, "browser crashed"
+
+    with metrics.phase("write"):
+        if reviews:
+            flush(reviews)
+        if ledger:
+            ledger.add_fingerprints(resolved, written)
+            ledger.mark_done(resolved, url, len(written))
+    metrics.count("reviews", len(written))
+    metrics.set_status("done")
+    return "done", len(written), None
+
+def run_workers(urls, sink, driver_options, job, workers=1, ledger=None, dedup=None, scheduler=None):
+    """
+    Scrapes all URLs with N isolated drivers sharing one queue. `urls` holds plain
+    URLs or (source_url, resolved_url) pairs from build_work_list(). `driver_options`
+    are setup_driver() keyword arguments, `job` comes from job_settings(); `sink`
+    must be thread-safe.
+    """
+    tasks = queue.Queue()
+    for idx, item in enumerate(urls, start=1):
+        url, resolved = item if isinstance(item, tuple) else (item, None)
+        tasks.put((idx, url, resolved, 1))
 
-    driver = setup_driver(headless=headless_mode)
-    all_reviews = []
+    threads = []
+    for worker_id in range(1, max(1, workers) + 1):
+        t = threading.Thread(
+            target=run_worker,
+            args=(worker_id, tasks, sink, driver_options, job),
+            kwargs={"ledger": ledger, "dedup": dedup, "scheduler": scheduler},
+            daemon=True,
+        )
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+# ---------- distributed queue ----------
+QUEUE_DB_PATH = os.path.join("all_reviews", "queue.sqlite3")
+
+class LeaseQueue:
+    """
+    Gives run_worker() the queue.Queue interface over a TaskQueue / RemoteTaskQueue:
+    get_nowait() leases a task, put() hands a crashed one back, finish() reports
+    the outcome. A background thread renews this host's leases while they run.
+    """
+    def __init__(self, backend, name=None, heartbeat_every=30.0, poll=5.0):
+        self.backend = backend
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_every = heartbeat_every
+        self.poll = poll
+        self.held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
 
-    combined_output_path = os.path.join("all_reviews", "all_reviews_combined.json")
-    os.makedirs("all_reviews", exist_ok=True)
-    if os.path.exists(combined_output_path):
-        with open(combined_output_path, "r", encoding="utf-8") as f:
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_every):
+            with self._lock:
+                ids = list(self.held)
+            if not ids:
+                continue
             try:
-                all_reviews = json.load(f)
-            except:
-                all_reviews = []
-
-    for idx, url in enumerate(urls, start=1):
-        if any(short in url for short in ["goo.gl", "g.co", "maps.app.goo.gl"]):
-            expanded_url = expand_google_maps_url(url)
-            if expanded_url:
-                url = expanded_url
-            else:
+                kept = set(self.backend.heartbeat(self.name, ids))
+            except Exception as e:
+                print(f"[WARN] Heartbeat failed: {e}")
                 continue
+            for lost in set(ids) - kept:
+                print(f"[WARN] Lease on task {lost} was lost; another worker may redo it.")
 
-        driver.get(url)
-        dismiss_consent(driver)
-        time.sleep(2)
+    def get_nowait(self):
+        while True:
+            leased = self.backend.lease(self.name, 1)
+            if leased:
+                task = leased[0]
+                with self._lock:
+                    self.held.add(task["id"])
+                return task["id"], task["source_url"], task["url"], task["attempt"]
+            if not self.backend.stats()["remaining"]:
+                raise queue.Empty
+            # Other hosts still hold leases; one may expire and come back.
+            time.sleep(self.poll)
 
-        place_info = collect_place_info(driver)
-        if not click_reviews_button(driver):
-            continue
+    def put(self, task):
+        task_id = task[0]
+        with self._lock:
+            self.held.discard(task_id)
+        self.backend.release(self.name, task_id)
 
+    def finish(self, task_id, status, review_count, detail):
+        if status == "requeued":
+            return  # already handed back by put()
+        try:
+            if not self.backend.complete(self.name, task_id, status, review_count, detail):
+                print(f"[WARN] Task {task_id} finished after its lease expired.")
+        finally:
+            # Stop renewing the lease even if the coordinator could not be told; it then
+            # expires and the task goes back to the queue.
+            with self._lock:
+                self.held.discard(task_id)
 
-        name = place_info.get("Name", "") or get_full_place_name(driver) or "Unknown"
-        organization = name
-        address = place_info.get("Address", "")
-        parts = [part.strip() for part in address.split(",")] if address else []
-        city = parts[-3] if len(parts) >= 3 else "Unknown"
+    def close(self):
+        self._stop.set()
 
-        lat = place_info.get("Lat")
-        lng = place_info.get("Lng")
+def open_task_queue(target, token=None):
+    """http(s)://host:port -> the coordinator's API; anything else is a queue database path."""
+    if target.startswith(("http://", "https://")):
+        return RemoteTaskQueue(target, token)
+    return TaskQueue(target)
 
-         # 📌 Print with organization #
-        print(f"[INFO] Organization #{idx}: {organization} ({city}) [{lat}, {lng}]")
+def serve_queue(work, address, db_path=QUEUE_DB_PATH, token=None, **job):
+    """
+    Coordinator: loads the work list into the queue database, serves it on
+    address ("host:port" or "port") until no task is pending or leased, then exits.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    task_queue = TaskQueue(db_path)
+    added = task_queue.add(work, key=place_key)
+    task_queue.set_job(**job)
+    host, _, port = address.rpartition(":")
+    host = host or "127.0.0.1"
+    server = make_queue_server(task_queue, host, int(port), token)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[INFO] Queued {added} new places; serving the job on {host}:{port}.")
+    try:
+        while True:
+            stats = task_queue.stats()
+            print(f"[INFO] Queue: {stats}")
+            if not stats["remaining"]:
+                break
+            time.sleep(30)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        task_queue.close()
 
-        reviews = scrape_reviews(driver, max_reviews, name, city, organization, lat, lng)
-        if reviews:
-            all_reviews.extend(reviews)
+def run_queue_workers(backend, sink, driver_options, job, workers=1, ledger=None, dedup=None, scheduler=None):
+    """
+    Worker host: runs N browsers leasing tasks from a shared queue. The coordinator's
+    job settings override `job`; host-level ones (recycling, window) stay local.
+    """
+    job = {**job, **backend.job()}
+    lease_queue = LeaseQueue(backend)
+    print(f"[INFO] Worker {lease_queue.name} joined job {job}.")
+    threads = []
+    for worker_id in range(1, max(1, workers) + 1):
+        t = threading.Thread(
+            target=run_worker,
+            args=(worker_id, lease_queue, sink, driver_options, job),
+            kwargs={"ledger": ledger, "dedup": dedup, "scheduler": scheduler, "on_result": lease_queue.finish},
+            daemon=True,
+        )
+        t.start()
+        threads.append(t)
+    try:
+        for t in threads:
+            t.join()
+    finally:
+        lease_queue.close()
+
+# ---------- checkpoint ledger ----------
+LEDGER_PATH = os.path.join("all_reviews", "ledger.sqlite3")
+DEDUP_PATH = os.path.join("all_reviews", "review_index.sqlite3")
+
+def place_id_cid(place_id):
+    """
+    CID inside a "ChIJ..." place_id: the id is base64 of a small protobuf whose
+    second fixed64 field is the CID. None for other place_id formats.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(place_id + "=" * (-len(place_id) % 4))
+    except ValueError:
+        return None
+    if len(raw) == 20 and raw[:3] == b"\x0a\x12\x09" and raw[11] == 0x11:
+        return int.from_bytes(raw[12:20], "little")
+    return None
+
+def place_key(url):
+    """
+    Stable key for a place: its CID (from ?cid=, the second half of a
+    "0x...:0x<cid>" feature id, or decoded from a place_id) when the URL carries
+    one, else its place_id, else the URL.
+    """
+    m = re.search(r"place_id[:=]([\w-]+)", url)
+    if m:
+        cid = place_id_cid(m.group(1))
+        return f"cid:{cid}" if cid is not None else "place_id:" + m.group(1)
+    m = re.search(r"(?:!1s|[?&]ftid=)0x[0-9a-f]+:(0x[0-9a-f]+)", url)
+    if m:
+        return f"cid:{int(m.group(1), 16)}"
+    m = re.search(r"[?&](?:cid|ludocid)=(\d+)", url)
+    if m:
+        return "cid:" + m.group(1)
+    return url
+
+class Ledger:
+    """
+    Per-URL checkpoint ledger in SQLite. One row per place key with status
+    ('done' / 'failed' / 'partial'), review count, last scraped time and failure reason.
+    The connection is shared by all workers and serialized with a lock.
+    """
+    def __init__(self, path=LEDGER_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            " key TEXT PRIMARY KEY,"
+            " source_url TEXT,"
+            " status TEXT NOT NULL,"
+            " review_count INTEGER NOT NULL DEFAULT 0,"
+            " last_scraped TEXT,"
+            " failure_reason TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS places_source_url ON places(source_url)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_fingerprints ("
+            " key TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " PRIMARY KEY (key, fingerprint)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS url_expansions ("
+            " short_url TEXT PRIMARY KEY,"
+            " expanded_url TEXT NOT NULL,"
+            " resolved_at TEXT)"
+        )
+        self._conn.commit()
+
+    def is_done(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM places WHERE status = 'done' AND (key = ? OR source_url = ?) LIMIT 1",
+                (place_key(url), url),
+            ).fetchone()
+        return row is not None
 
-    driver.quit()
+    def _record(self, url, source_url, status, review_count, failure_reason):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO places (key, source_url, status, review_count, last_scraped, failure_reason, attempts)"
+                " VALUES (?, ?, ?, ?, ?, ?, 1)"
+                " ON CONFLICT(key) DO UPDATE SET source_url = excluded.source_url, status = excluded.status,"
+                " review_count = excluded.review_count, last_scraped = excluded.last_scraped,"
+                " failure_reason = excluded.failure_reason, attempts = places.attempts + 1",
+                (place_key(url), source_url, status, review_count,
+                 datetime.now().isoformat(timespec="seconds"), failure_reason),
+            )
+
+    def mark_done(self, url, source_url, review_count):
+        self._record(url, source_url, "done", review_count, None)
+
+    def mark_failed(self, url, source_url, reason):
+        self._record(url, source_url, "failed", 0, reason)
+
+    def mark_partial(self, url, source_url, review_count, reason):
+        """Some reviews were written, but not all; like a failure, the place is retried."""
+        self._record(url, source_url, "partial", review_count, reason)
+
+    def known_fingerprints(self, url):
+        """Fingerprints of the reviews already stored for this place."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint FROM review_fingerprints WHERE key = ?", (place_key(url),)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def add_fingerprints(self, url, fingerprints):
+        key = place_key(url)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO review_fingerprints (key, fingerprint) VALUES (?, ?)",
+                [(key, fp) for fp in fingerprints],
+            )
+
+    def cached_expansion(self, short_url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expanded_url FROM url_expansions WHERE short_url = ?", (short_url,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_expansion(self, short_url, expanded_url):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO url_expansions (short_url, expanded_url, resolved_at) VALUES (?, ?, ?)",
+                (short_url, expanded_url, datetime.now().isoformat(timespec="seconds")),
+            )
+
+    def summary(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM places GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# ---------- output ----------
+OUTPUT_DIR = "all_reviews"
+STREAM_OUTPUT_PATH = os.path.join(OUTPUT_DIR, "all_reviews_combined.jsonl")
+COMBINED_OUTPUT_PATH = os.path.join(OUTPUT_DIR, "all_reviews_combined.json")
+METRICS_PATH = os.path.join(OUTPUT_DIR, "metrics.jsonl")
+PARQUET_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "reviews_parquet")
+PARQUET_BATCH_ROWS = 50000
+
+class JsonlReviewWriter:
+    """
+    Appends each place's reviews to a JSONL file and fsyncs right away, so a crash
+    loses at most the place in flight. Safe to share between worker threads.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+        # Terminate a line torn by a previous crash so the next record stays parseable.
+        if self._f.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._f.write("\n")
+
+    def write_place(self, idx, url, reviews):
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in reviews)
+        with self._lock:
+            self._f.write(lines)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self.count += len(reviews)
+        print(f"[INFO] Appended {len(reviews)} reviews for #{idx} to {self.path}.")
+
+    def drain(self, consume):
+        """
+        Hands every record written so far to consume(records, digest), then empties
+        the file. The digest names the batch, so a consume repeated after a crash
+        (before the file was emptied) overwrites its earlier output.
+        """
+        with self._lock:
+            self._f.flush()
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            if not raw.strip():
+                return 0
+            records = list(iter_jsonl(self.path))
+            consume(records, hashlib.sha1(raw).hexdigest()[:16])
+            self._f.truncate(0)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            return len(records)
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+def iter_jsonl(path):
+    """Yields records from a JSONL file, skipping a torn last line left by a crash."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"[WARN] Skipping malformed line in {path}.")
+
+def _existing_reviews(path):
+    """Streams an existing combined JSON list; a damaged tail is dropped with a warning."""
+    try:
+        yield from iter_json_array(path)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Could not read the rest of {path} ({e}); keeping the reviews read so far.")
 
-    with open(combined_output_path, "w", encoding="utf-8") as f:
-        json.dump(all_reviews, f, ensure_ascii=False, indent=2)
-    print(f"[INFO] Saved all {len(all_reviews)} reviews to {combined_output_path}.")
+def compact_reviews(jsonl_path=STREAM_OUTPUT_PATH, output_path=COMBINED_OUTPUT_PATH):
+    """
+    Merges the streamed JSONL (plus any existing combined JSON list) into one
+    pretty-printed JSON file, writing records one at a time. Reviews written twice
+    (a retried partial place, a crash between replace and remove below) are kept
+    once; only their 64-bit keys are held in memory.
+    """
+    sources = []
+    tmp_path = output_path + ".tmp"
+    if os.path.exists(output_path):
+        sources.append(_existing_reviews(output_path))
+    if os.path.exists(jsonl_path):
+        sources.append(iter_jsonl(jsonl_path))
+
+    total = duplicates = 0
+    keys = set()
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for source in sources:
+            for record in source:
+                fingerprint = record.get("fingerprint") or review_fingerprint(record.get("author"), record.get("content"))
+                key = review_key(record.get("organization"), fingerprint)
+                if key in keys:
+                    duplicates += 1
+                    continue
+                keys.add(key)
+                f.write(",\n  " if total else "\n  ")
+                f.write(json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+                total += 1
+        f.write("\n]" if total else "]")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output_path)
+    if os.path.exists(jsonl_path):
+        os.remove(jsonl_path)
+    print(f"[INFO] Compacted {total} reviews into {output_path} ({duplicates} duplicates dropped).")
+    return total
+
+def iter_json_array(path, chunk_size=1 << 20):
+    """Yields the items of a (possibly multi-GB) top-level JSON list without loading it whole."""
+    decoder = json.JSONDecoder()
+    buf, pos, started = "", 0, False
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buf = buf[pos:] + chunk
+            pos = 0
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if not started and pos < len(buf):
+                    if buf[pos] != "[":
+                        raise ValueError(f"{path} is not a JSON list")
+                    started, pos = True, pos + 1
+                    continue
+                if pos < len(buf) and buf[pos] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if not chunk:
+                        raise
+                    break  # item continues in the next chunk
+                yield item
+                pos = end
+            if not chunk:
+                return
+
+# ---------- parquet output ----------
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError:
+        raise SystemExit("[ERROR] Parquet output needs pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.dataset
+
+def review_schema(pa):
+    """Typed review columns; city and scrape_date are also the partition keys."""
+    return pa.schema([
+        ("city", pa.dictionary(pa.int32(), pa.string())),
+        ("organization", pa.dictionary(pa.int32(), pa.string())),
+        ("author", pa.string()),
+        ("date", pa.date32()),
+        ("rating", pa.float32()),
+        ("content", pa.string()),
+        ("lat", pa.float64()),
+        ("lng", pa.float64()),
+        ("fingerprint", pa.string()),
+        ("scrape_date", pa.date32()),
+    ])
+
+def _to_float(value):
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+def _to_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None  # "Unknown"
+
+def reviews_to_table(records, scrape_date=None):
+    """Review dicts -> pyarrow Table with review_schema(). Unparseable values become nulls."""
+    pa, _ = require_pyarrow()
+    default_scrape_date = _to_date(scrape_date) or date.today()
+    columns = {name: [] for name in review_schema(pa).names}
+    for r in records:
+        columns["city"].append(r.get("city") or "Unknown")
+        columns["organization"].append(r.get("organization"))
+        columns["author"].append(r.get("author"))
+        columns["date"].append(_to_date(r.get("date")))
+        columns["rating"].append(_to_float(r.get("rating")))
+        columns["content"].append(r.get("content"))
+        columns["lat"].append(_to_float(r.get("lat")))
+        columns["lng"].append(_to_float(r.get("lng")))
+        columns["fingerprint"].append(r.get("fingerprint") or review_fingerprint(r.get("author"), r.get("content")))
+        columns["scrape_date"].append(_to_date(r.get("scrape_date")) or default_scrape_date)
+    return pa.Table.from_pydict(columns, schema=review_schema(pa))
+
+def write_parquet_batch(table, root, batch_id):
+    """
+    Writes one batch into the dataset at `root`, hive-partitioned as
+    city=<city>/scrape_date=<YYYY-MM-DD>/part-<batch_id>-<n>.parquet (one row group per file).
+    """
+    pa, ds = require_pyarrow()
+    partitioning = ds.partitioning(
+        pa.schema([("city", pa.string()), ("scrape_date", pa.date32())]), flavor="hive"
+    )
+    ds.write_dataset(
+        table.cast(table.schema.set(0, pa.field("city", pa.string()))),
+        root,
+        format="parquet",
+        partitioning=partitioning,
+        basename_template=f"part-{batch_id}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_rows_per_group=max(table.num_rows, 1),
+        min_rows_per_group=0,
+    )
+
+class ParquetReviewWriter:
+    """
+    Parquet counterpart of JsonlReviewWriter with the same write_place() interface.
+    Places are appended to a fsynced JSONL spool inside the dataset directory, and
+    every `batch_rows` reviews the spool becomes one row group per city/scrape_date
+    partition. A spool left behind by a crash is flushed on the next start.
+    """
+    def __init__(self, root, batch_rows=PARQUET_BATCH_ROWS):
+        require_pyarrow()
+        self.path = root
+        self.batch_rows = batch_rows
+        self.count = 0
+        self._spool = JsonlReviewWriter(os.path.join(root, "_spool.jsonl"))
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.flush()
+
+    def write_place(self, idx, url, reviews):
+        today = date.today().isoformat()
+        self._spool.write_place(idx, url, [dict(r, scrape_date=today) for r in reviews])
+        with self._lock:
+            self.count += len(reviews)
+            self._pending += len(reviews)
+            due = self._pending >= self.batch_rows
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            written = self._spool.drain(
+                lambda records, digest: write_parquet_batch(reviews_to_table(records), self.path, digest)
+            )
+            self._pending = 0
+        if written:
+            print(f"[INFO] Wrote a Parquet batch of {written} reviews to {self.path}.")
+
+    def close(self):
+        self.flush()
+        self._spool.close()
+        try:
+            os.remove(self._spool.path)
+        except OSError:
+            pass
+
+def convert_to_parquet(input_path, root=PARQUET_OUTPUT_DIR, scrape_date=None, batch_rows=PARQUET_BATCH_ROWS):
+    """
+    Converts an all_reviews_combined.json list (or a .jsonl stream) into the
+    partitioned Parquet dataset, batch_rows records at a time. scrape_date
+    defaults to the input file's modification date.
+    """
+    require_pyarrow()
+    if scrape_date is None:
+        scrape_date = datetime.fromtimestamp(os.path.getmtime(input_path)).date()
+    records = iter_jsonl(input_path) if input_path.endswith(".jsonl") else iter_json_array(input_path)
+    name = hashlib.sha1(os.path.abspath(input_path).encode("utf-8")).hexdigest()[:8]
+    total, batch, part = 0, [], 0
+
+    def write(batch, part):
+        write_parquet_batch(reviews_to_table(batch, scrape_date), root, f"{name}{part:05d}")
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_rows:
+            write(batch, part)
+            total, batch, part = total + len(batch), [], part + 1
+    if batch:
+        write(batch, part)
+        total += len(batch)
+    print(f"[INFO] Converted {total} reviews from {input_path} into {root}.")
+    return total
+
+# ---------- main ----------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Scrape Google Maps reviews.",
+        usage="python google-maps-scraper.py <input_file_or_url> [max_reviews] [headless] [options]",
+    )
+    parser.add_argument("input", nargs="?", help="Google Maps URL or .txt file with one URL per line")
+    parser.add_argument("max_reviews", nargs="?", type=int, default=30, help="max reviews per place (default 30)")
+    parser.add_argument("headless", nargs="?", default="true", help="'false' to show the browser window")
+    parser.add_argument("--workers", type=int, default=1, help="number of parallel headless browsers (default 1)")
+    parser.add_argument("--max-attempts", type=int, default=2, help="tries per URL when Chrome crashes (default 2)")
+    parser.add_argument("--output", help=f"JSONL file reviews are appended to (default {STREAM_OUTPUT_PATH}), or the dataset directory with --format parquet (default {PARQUET_OUTPUT_DIR})")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="output backend (parquet needs pyarrow)")
+    parser.add_argument("--parquet-batch", type=int, default=PARQUET_BATCH_ROWS, help=f"reviews per Parquet row-group batch (default {PARQUET_BATCH_ROWS})")
+    parser.add_argument("--to-parquet", metavar="JSON", help="convert an existing all_reviews_combined.json (or .jsonl) into the Parquet dataset and exit")
+    parser.add_argument("--scrape-date", help="scrape_date (YYYY-MM-DD) for --to-parquet (default: the input file's modification date)")
+    parser.add_argument("--profile", choices=["standard", "lean"], default="standard", help="'lean' adds trimmed Chrome flags and the lean block list")
+    parser.add_argument("--block", choices=sorted(BLOCK_PRESETS), help="request block list preset (default: 'off', or 'lean' with --profile lean)")
+    parser.add_argument("--block-url", action="append", default=[], metavar="PATTERN", help="extra URL pattern to block (repeatable)")
+    parser.add_argument("--allow-url", action="append", default=[], metavar="PATTERN", help="URL pattern that must never be blocked (repeatable)")
+    parser.add_argument("--measure-bytes", action="store_true", help="record bytes/requests transferred per place in the metrics")
+    parser.add_argument("--rpc", action="store_true", help="read reviews from the page's review-list responses instead of the DOM (falls back to the DOM)")
+    parser.add_argument("--recycle-after", type=int, default=50, help="restart each worker's browser after N places (0 = never, default 50)")
+    parser.add_argument("--window", type=int, default=0, metavar="N", help="write reviews every N as they load and remove read cards from the page, keeping memory flat on places with thousands of reviews (0 = once per place)")
+    parser.add_argument("--place-timeout", type=int, metavar="S", help="seconds of review loading per place; a place cut off is saved as partial and retried next run (default 300, no limit with --window; 0 = no limit)")
+    parser.add_argument("--max-browser-mb", type=int, default=1500, help="restart a worker's browser once Chrome uses more than this much RSS (0 = no limit)")
+    parser.add_argument("--ledger", default=LEDGER_PATH, help=f"SQLite checkpoint ledger; completed places are skipped (default {LEDGER_PATH}, '' to disable)")
+    parser.add_argument("--resolve-workers", type=int, default=16, help="concurrent short-link expansions in the pre-pass (default 16)")
+    parser.add_argument("--worklist", default=WORKLIST_PATH, help=f"where the resolved, deduplicated work list is written (default {WORKLIST_PATH}, '' to skip)")
+    parser.add_argument("--resolve-only", action="store_true", help="build the work list and exit without starting a browser")
+    parser.add_argument("--min-delay", type=float, default=0.0, help="minimum seconds between a worker's places; grows automatically when Google throttles (default 0)")
+    parser.add_argument("--throttle-cooldown", type=float, default=30.0, help="average pause of a worker after a CAPTCHA / consent wall / unusual-traffic page (default 30s)")
+    parser.add_argument("--serve-queue", metavar="[HOST:]PORT", help="coordinator: queue the input URLs and serve them to --queue workers until the job is done (HOST defaults to 127.0.0.1; any other host needs --queue-token)")
+    parser.add_argument("--queue", metavar="URL|DB", help="worker: lease places from a coordinator (http://host:port) or a shared queue database instead of reading input")
+    parser.add_argument("--queue-db", default=QUEUE_DB_PATH, help=f"coordinator's queue database (default {QUEUE_DB_PATH})")
+    parser.add_argument("--queue-token", default=os.environ.get("SCRAPER_QUEUE_TOKEN"), help="shared secret for the coordinator API (default $SCRAPER_QUEUE_TOKEN)")
+    parser.add_argument("--dedup", default=DEDUP_PATH, help=f"global review dedup index shared by all runs (default {DEDUP_PATH}, '' to disable)")
+    parser.add_argument("--dedup-capacity", type=int, default=20_000_000, help="reviews the in-memory Bloom filter is sized for (default 20M, ~24 MB)")
+    parser.add_argument("--since-last", action="store_true", help="refresh completed places too, sorting newest first and stopping at the first already stored review")
+    parser.add_argument("--metrics", default=METRICS_PATH, help=f"per-place timings/counters as JSONL (default {METRICS_PATH}, '' to disable)")
+    parser.add_argument("--compact", action="store_true", help=f"merge the JSONL output into {COMBINED_OUTPUT_PATH} and exit")
+    args = parser.parse_args(argv)
+    if args.output is None:
+        args.output = PARQUET_OUTPUT_DIR if args.format == "parquet" or args.to_parquet else STREAM_OUTPUT_PATH
+    if not args.compact and not args.to_parquet and not args.queue and not args.input:
+        parser.error("the following arguments are required: input")
+    if args.compact and (args.format == "parquet" or os.path.isdir(args.output)):
+        parser.error(f"--compact merges a JSONL file, but {args.output} is a directory "
+                     "(Parquet output needs no compaction)")
+    if args.serve_queue and not args.queue_token:
+        host = args.serve_queue.rpartition(":")[0] or "127.0.0.1"
+        if not is_loopback(host):
+            parser.error(f"--serve-queue on {host} needs --queue-token or $SCRAPER_QUEUE_TOKEN")
+    if args.since_last and not args.ledger:
+        parser.error("--since-last needs the ledger (do not pass --ledger '')")
+    return args
+
+def main():
+    args = parse_args()
+    if args.compact:
+        compact_reviews(args.output)
+        return
+    if args.to_parquet:
+        convert_to_parquet(args.to_parquet, args.output, args.scrape_date, args.parquet_batch)
+        return
+
+    input_arg = args.input
+    max_reviews = args.max_reviews
+    driver_options = {
+        "headless": args.headless.lower() != "false",
+        "block": args.block or ("lean" if args.profile == "lean" else "off"),
+        "block_extra": args.block_url,
+        "allow": args.allow_url,
+        "lean": args.profile == "lean",
+        "measure_bytes": args.measure_bytes,
+        "capture_rpc": args.rpc,
+    }
+
+    ledger = Ledger(args.ledger) if args.ledger else None
+    if not args.queue:
+        if input_arg.endswith(".txt"):
+            with open(input_arg, "r", encoding="utf-8") as f:
+                urls = [line.strip() for line in f if line.strip()]
+        else:
+            urls = [input_arg]
+
+        work = build_work_list(urls, ledger, args.resolve_workers, args.worklist)
+        if args.serve_queue:
+            if ledger and not args.since_last:
+                work = [(src, url) for src, url in work if not ledger.is_done(src) and not ledger.is_done(url)]
+        if args.resolve_only or args.serve_queue:
+            if ledger:
+                ledger.close()
+            if args.serve_queue:
+                serve_queue(work, args.serve_queue, args.queue_db, args.queue_token, max_reviews=max_reviews,
+                            max_attempts=args.max_attempts, since_last=args.since_last)
+            return
+
+    if args.format == "parquet":
+        writer = ParquetReviewWriter(args.output, args.parquet_batch)
+    else:
+        writer = JsonlReviewWriter(args.output)
+    dedup = ReviewIndex(args.dedup, args.dedup_capacity) if args.dedup else None
+    job = job_settings(
+        max_reviews=max_reviews, max_attempts=args.max_attempts, since_last=args.since_last,
+        recycle_after=args.recycle_after, max_memory_mb=args.max_browser_mb, window=args.window,
+        place_timeout=args.place_timeout if args.place_timeout is not None else (0 if args.window else 300),
+    )
+    scheduler = ThrottleScheduler(args.workers, min_delay=args.min_delay, cooldown=args.throttle_cooldown)
+    if args.metrics:
+        metrics.open(args.metrics)
+    try:
+        if args.queue:
+            backend = open_task_queue(args.queue, args.queue_token)
+            try:
+                run_queue_workers(
+                    backend, writer.write_place, driver_options, job, workers=args.workers, ledger=ledger,
+                    dedup=dedup, scheduler=scheduler,
+                )
+            finally:
+                backend.close()
+        else:
+            run_workers(
+                work, writer.write_place, driver_options, job, workers=args.workers, ledger=ledger,
+                dedup=dedup, scheduler=scheduler,
+            )
+    finally:
+        writer.close()
+        if ledger:
+            print(f"[INFO] Ledger: {ledger.summary()}")
+            ledger.close()
+        print(f"[INFO] Throttling: {scheduler.summary()}")
+        if dedup:
+            print(f"[INFO] Dedup index: {dedup.summary()}")
+            dedup.close()
+        metrics.close()
+        metrics.print_summary(os.path.splitext(args.metrics)[0] + "_summary.json" if args.metrics else None)
+    print(f"[INFO] Saved {writer.count} new reviews to {args.output}.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,117 @@
+"""
+Case-insensitive multi-keyword substring matcher.
+
+All keywords are compiled into one Aho-Corasick automaton, so a scan does a
+fixed amount of work per character of text whether there are 80 keywords or
+20,000, unlike `any(k in text for k in keywords)`. Throughput still drops
+somewhat as the automaton outgrows the CPU caches (see `benchmarks.py
+keywords`). The C automaton from `pyahocorasick` is used when it is
+installed; otherwise a pure-Python goto/fail table, about 3x slower.
+"""
+from collections import deque
+
+try:
+    import ahocorasick
+except ImportError:  # optional dependency
+    ahocorasick = None
+
+
+def load_keywords(path):
+    """Reads one keyword per line; blank lines and lines starting with '#' are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+class _Automaton:
+    """Pure-Python Aho-Corasick: goto transitions, failure links, longest keyword ending at each state."""
+    def __init__(self, words):
+        self.goto = [{}]
+        self.out = [None]
+        for word in words:
+            state = 0
+            for ch in word:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.out.append(None)
+                state = nxt
+            self.out[state] = word
+        self.fail = [0] * len(self.goto)
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, nxt in self.goto[state].items():
+                pending.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                # A keyword ending here or, failing that, the longest one ending at a suffix
+                if self.out[nxt] is None:
+                    self.out[nxt] = self.out[self.fail[nxt]]
+
+    def search(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if out[state] is not None:
+                return out[state]
+        return None
+
+
+class _CAutomaton:
+    """Same interface on top of pyahocorasick."""
+    def __init__(self, words):
+        self.automaton = ahocorasick.Automaton()
+        for word in words:
+            self.automaton.add_word(word, word)
+        self.automaton.make_automaton()
+
+    def search(self, text):
+        found = None
+        for end, word in self.automaton.iter(text):
+            if found is not None and end != found[0]:
+                break
+            if found is None or len(word) > len(found[1]):
+                found = (end, word)
+        return found[1] if found else None
+
+
+class KeywordMatcher:
+    def __init__(self, keywords, backend=None):
+        """backend: 'c' (pyahocorasick), 'python', or None for the fastest available."""
+        self.keywords = sorted({k.lower() for k in keywords if k and k.strip()})
+        if backend is None:
+            backend = "c" if ahocorasick else "python"
+        if backend == "c" and not ahocorasick:
+            raise ImportError("the 'c' backend needs pyahocorasick: pip install pyahocorasick")
+        self.backend = backend
+        self._automaton = None
+        if self.keywords:
+            self._automaton = _CAutomaton(self.keywords) if backend == "c" else _Automaton(self.keywords)
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_keywords(path))
+
+    def search(self, text):
+        """
+        Returns the first keyword found in `text` (lowercased), or None. "First" is
+        the one that ends earliest; of several ending there, the longest.
+        """
+        if not self._automaton or not text:
+            return None
+        return self._automaton.search(text.lower())
+
+    def __contains__(self, text):
+        return self.search(text) is not None
+
+    def __len__(self):
+        return len(self.keywords)
@@ -1,8 +1,24 @@
-import requests
+import os
+import sys
+import json
 import time
+import sqlite3
+import random
+import argparse
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from keyword_matcher import KeywordMatcher
 
 API_KEY = ''  # Insert your real API key here
 
+# Override to point at a local mock Places server (see mock_server.py)
+API_BASE = os.environ.get("PLACES_API_BASE", "https://maps.googleapis.com/maps/api/place")
+
 radius = 50000  # 50 km
 
 locations = [
@@ -17,6 +33,21 @@ locations = [
     "50.8000,29.9500",  # Пн.-захід (Буча/Ірпінь/Бородянка)
 ]
 
+# Adaptive grid: sweep starts from this bounding box (south, west, north, east)
+REGION_BBOX = (49.15, 29.20, 51.60, 32.20)
+
+# Грубий контур Київської області (lat, lng); клітинки повністю поза ним не запитуються.
+# Точний фільтр — is_in_kyiv_region/is_in_kyiv_city по Place Details.
+REGION_OUTLINE = [
+    (51.45, 29.30), (51.60, 30.55), (51.25, 30.65), (50.95, 31.05), (50.60, 31.95),
+    (50.25, 32.15), (49.85, 31.55), (49.60, 31.15), (49.20, 30.35), (49.30, 29.55),
+    (49.85, 29.25), (50.45, 29.20), (51.00, 29.30),
+]
+
+MAX_RADIUS = 50000     # Nearby Search limit, m
+MIN_RADIUS = 1000      # do not split cells below this, m
+RESULTS_CAP = 60       # Nearby Search returns at most 3 pages × 20
+
 place_types = [
     "local_government_office",
     "city_hall",
@@ -24,49 +55,18 @@ place_types = [
     "university",
 ]
 
-EXCLUDE_KEYWORDS = [
-    # Visa / docs
-    "візовий", "visa", "вфс", "vfs", "пп документ",
-
-    # Addiction treatment
-    "addiction treatment center", "rehab", "rehabilitation", "detox", "detoxification",
-    "drug treatment", "substance abuse", "alcohol rehab", "drug rehab", "methadone clinic",
-    "sobriety center", "treatment facility", "12-step program",
-    "наркоцентр", "наркологічний центр", "лікування залежностей", "лікування адикцій",
-    "реабілітаційний центр", "реабілітація", "центр реабілітації",
-    "центр лікування наркоманії", "центр лікування алкоголю",
-    "наркологія", "наркологічна клініка", "лікування від наркотиків",
-    "лікування від алкоголю", "клініка залежностей", "терапія залежностей",
-    "нарко центр", "реаб центр", "реаб. центр", "rehab center", "reab", "реаб",
-
-    # Private hospitals / clinics
-    "приватна лікарня", "приватна клініка", "приватний медичний центр",
-    "приватний госпіталь", "приватний медцентр", "приватний мед заклад",
-    "private hospital", "private clinic", "private medical center",
-    "private healthcare", "private infirmary",
-
-    # Lawyers / legal
-    "адвокат", "адвокатське бюро", "адвокатська компанія", "адвокатське об'єднання",
-    "юридична фірма", "юридична компанія", "юридичні послуги", "правова допомога",
-    "правова консультація", "юрист", "юридичн",  # стем ловить: юридична/юридичні/…
-    "lawyer", "attorney", "law firm", "legal services", "legal aid", "solicitor", "barrister", 
-
-    # Private schools
-    "приватна школа", "приватний навчальний заклад", "приватний ліцей", "приватний коледж",
-    "private school", "private high school", "private academy", "private college",
-
-    # Private universities
-    "приватний університет", "приватний інститут", "приватна академія",
-    "private university", "private institute", "private academy",
-]
+# Name exclusions live in exclude_keywords.txt (one keyword per line)
+EXCLUDE_KEYWORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exclude_keywords.txt")
 
 # ---------- helpers ----------
 
-EXCLUDE_KEYWORDS_LOWER = [k.lower() for k in EXCLUDE_KEYWORDS]
+exclude_matcher = None  # KeywordMatcher, built once in main()
 
 def name_excluded(name: str) -> bool:
-    n = (name or "").lower()
-    return any(k in n for k in EXCLUDE_KEYWORDS_LOWER)
+    keyword = exclude_matcher.search(name)
+    if keyword:
+        print(f"[INFO] Excluded '{name}' (keyword: {keyword})")
+    return keyword is not None
 
 def is_in_kyiv_region(address_components):
     """True для Київської області (Київська область)."""
@@ -97,84 +97,448 @@ def is_in_kyiv_city(address_components):
 def accept_kyiv_region_or_city(address_components):
     return is_in_kyiv_region(address_components) or is_in_kyiv_city(address_components)
 
-def fetch_place_details(place_id: str) -> dict:
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
-    params = {
-        "place_id": place_id,
-        "fields": "address_components,name,url",
-        "key": API_KEY
-    }
-    r = requests.get(url, params=params, timeout=15)
-    if not r.ok:
-        return {}
-    data = r.json()
-    return data.get("result", {})
-
-def nearby_page(params: dict) -> dict:
-    """Обробка паузи для next_page_token (2–5s) за рекомендацією Google."""
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-    for _ in range(6):  # ~12–15s максимум
-        resp = requests.get(url, params=params, timeout=20)
-        data = resp.json()
-        status = data.get("status")
-    
-        if status == "OK" and "results" in data:
+# ---------- Place Details cache ----------
+
+# Responses that are final for a place_id; anything else (OVER_QUERY_LIMIT, HTTP errors) is not cached.
+CACHEABLE_STATUSES = {"OK", "NOT_FOUND", "ZERO_RESULTS", "INVALID_REQUEST"}
+
+class DetailsCache:
+    """
+    On-disk Place Details cache (SQLite) keyed by place_id, with a TTL and a
+    size cap. Empty results are stored too, so places that fail the region
+    filter are not fetched again by overlapping cells or later runs.
+    """
+
+    def __init__(self, path: str, ttl_days: float = 30, max_entries: int = 200000):
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS details ("
+            " place_id TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS details_fetched_at ON details(fetched_at)")
+        self.conn.commit()
+
+    def get(self, place_id: str):
+        """Cached result dict, or None on a miss / expired entry."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT result, fetched_at FROM details WHERE place_id = ?", (place_id,)
+            ).fetchone()
+            if row and time.time() - row[1] <= self.ttl:
+                self.hits += 1
+                return json.loads(row[0])
+            self.misses += 1
+            return None
+
+    def put(self, place_id: str, result: dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO details (place_id, result, fetched_at) VALUES (?, ?, ?)",
+                (place_id, json.dumps(result, ensure_ascii=False), time.time()),
+            )
+            self._inserts += 1
+            if self._inserts % 1000 == 0:
+                self._evict()
+
+    def _evict(self):
+        """Drops expired rows, then the oldest ones above max_entries. Caller holds the lock."""
+        self.conn.execute("DELETE FROM details WHERE fetched_at < ?", (time.time() - self.ttl,))
+        excess = self.conn.execute("SELECT COUNT(*) FROM details").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM details WHERE place_id IN"
+                " (SELECT place_id FROM details ORDER BY fetched_at LIMIT ?)", (excess,)
+            )
+
+    def close(self):
+        with self.lock, self.conn:
+            self._evict()
+        self.conn.close()
+
+# ---------- Places API client ----------
+
+class TokenBucket:
+    """Blocks callers so that on average no more than `rate` requests/second go out."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PlacesClient:
+    """
+    Thread-safe Places API client: one pooled HTTP session, a shared QPS limit
+    and exponential backoff on OVER_QUERY_LIMIT / HTTP 429 / 5xx.
+    """
+
+    def __init__(self, api_key: str, qps: float = 10, pool_size: int = 16,
+                 max_retries: int = 6, api_base: str = API_BASE, cache: DetailsCache = None):
+        self.api_key = api_key
+        self.cache = cache
+        self.api_base = api_base.rstrip("/")
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(qps, burst=max(1, int(qps)))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        self._local = threading.local()  # per-thread call counter, for per-cell stats
+
+    @property
+    def thread_calls(self) -> int:
+        return getattr(self._local, "calls", 0)
+
+    def _get(self, endpoint: str, params: dict, timeout: int = 20) -> dict:
+        url = f"{self.api_base}/{endpoint}/json"
+        delay = 1.0
+        data = {}
+        for attempt in range(self.max_retries):
+            self.bucket.acquire()
+            with self._calls_lock:
+                self.calls += 1
+            self._local.calls = self.thread_calls + 1
+            try:
+                r = self.session.get(url, params=params, timeout=timeout)
+            except requests.RequestException as e:
+                print(f"[WARN] {endpoint}: {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+            if r.status_code == 429 or r.status_code >= 500:
+                data = {"status": f"HTTP_{r.status_code}"}
+            elif not r.ok:
+                return {"status": f"HTTP_{r.status_code}"}
+            else:
+                data = r.json()
+                if data.get("status") != "OVER_QUERY_LIMIT":
+                    return data
+            # Back off with jitter so parallel workers don't retry in lockstep
+            time.sleep(delay + random.uniform(0, delay / 2))
+            delay = min(delay * 2, 30)
+        return data
+
+    def fetch_place_details(self, place_id: str) -> dict:
+        if self.cache:
+            cached = self.cache.get(place_id)
+            if cached is not None:
+                return cached
+        params = {
+            "place_id": place_id,
+            "fields": "address_components,name,url",
+            "key": self.api_key
+        }
+        data = self._get("details", params, timeout=15)
+        result = data.get("result", {})
+        if self.cache and data.get("status") in CACHEABLE_STATUSES:
+            self.cache.put(place_id, result)
+        return result
+
+    def nearby_page(self, params: dict) -> dict:
+        """Обробка паузи для next_page_token (2–5s) за рекомендацією Google."""
+        data = {}
+        for _ in range(6):  # ~12–15s максимум
+            data = self._get("nearbysearch", params)
+            status = data.get("status")
+
+            if status == "OK" and "results" in data:
+                return data
+            if status == "INVALID_REQUEST" and "pagetoken" in params:
+                time.sleep(2.5)
+                continue
+            # для ZERO_RESULTS/ін. — повертаємо як є
             return data
-        if status == "INVALID_REQUEST" and "pagetoken" in params:
-            time.sleep(2.5)
-            continue
-        # для ZERO_RESULTS/OVER_QUERY_LIMIT/ін. — повертаємо як є
         return data
-    return data
 
-# ---------- main ----------
+# ---------- adaptive grid ----------
+
+class Tile:
+    """Lat/lng rectangle searched with the smallest circle that covers it."""
+
+    def __init__(self, south: float, west: float, north: float, east: float, depth: int = 0):
+        self.south, self.west, self.north, self.east = south, west, north, east
+        self.depth = depth
+
+    @property
+    def center(self):
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    @property
+    def radius(self) -> int:
+        # Farthest corner: in the northern hemisphere the southern corners are farther than the northern ones
+        lat, lng = self.center
+        return math.ceil(max(haversine_m(lat, lng, a, b) for a, b in self.corners()))
+
+    @property
+    def location(self) -> str:
+        lat, lng = self.center
+        return f"{lat:.5f},{lng:.5f}"
+
+    def split(self):
+        lat, lng = self.center
+        d = self.depth + 1
+        return [
+            Tile(self.south, self.west, lat, lng, d), Tile(self.south, lng, lat, self.east, d),
+            Tile(lat, self.west, self.north, lng, d), Tile(lat, lng, self.north, self.east, d),
+        ]
+
+    def corners(self):
+        return [(self.south, self.west), (self.south, self.east), (self.north, self.east), (self.north, self.west)]
+
+    def contains(self, lat: float, lng: float) -> bool:
+        return self.south <= lat <= self.north and self.west <= lng <= self.east
+
+    def __str__(self):
+        return f"[{self.south:.4f},{self.west:.4f} – {self.north:.4f},{self.east:.4f}]"
+
+def haversine_m(lat1, lng1, lat2, lng2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371000 * 2 * math.asin(math.sqrt(a))
+
+def point_in_polygon(lat: float, lng: float, polygon) -> bool:
+    inside = False
+    for (a_lat, a_lng), (b_lat, b_lng) in zip(polygon, polygon[1:] + polygon[:1]):
+        if (a_lat > lat) != (b_lat > lat):
+            cross_lng = a_lng + (lat - a_lat) * (b_lng - a_lng) / (b_lat - a_lat)
+            if lng < cross_lng:
+                inside = not inside
+    return inside
+
+def _segments_cross(p1, p2, q1, q2) -> bool:
+    def orient(a, b, c):
+        return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+    d1, d2 = orient(q1, q2, p1), orient(q1, q2, p2)
+    d3, d4 = orient(p1, p2, q1), orient(p1, p2, q2)
+    return (d1 > 0) != (d2 > 0) and (d3 > 0) != (d4 > 0)
+
+def tile_intersects(tile: Tile, polygon) -> bool:
+    """False only if the tile lies entirely outside the polygon."""
+    corners = tile.corners()
+    if any(point_in_polygon(lat, lng, polygon) for lat, lng in corners):
+        return True
+    if any(tile.contains(lat, lng) for lat, lng in polygon):
+        return True
+    edges = list(zip(corners, corners[1:] + corners[:1]))
+    poly_edges = list(zip(polygon, polygon[1:] + polygon[:1]))
+    return any(_segments_cross(a, b, c, d) for a, b in edges for c, d in poly_edges)
+
+# ---------- sweep ----------
+
+class Sweep:
+    """
+    Walks Nearby Search concurrently. Each cell pages through results on its own
+    thread (so page-token waits overlap), and detail lookups for new candidates
+    run on a separate pool.
+    """
+
+    def __init__(self, client: PlacesClient, workers: int = 8, detail_workers: int = 16):
+        self.client = client
+        self.workers = workers
+        self.details_pool = ThreadPoolExecutor(max_workers=detail_workers)
+        self.detail_futures = []
+        self.results = set()       # лінки (по place_id) — фінальний вивід
+        self.claimed = set()       # place_id, які вже перевіряються/перевірені
+        self.cell_stats = []       # (place_type, cell, radius, results, calls, action)
+        self.lock = threading.Lock()
 
-results = set()       # лінки (по place_id) — фінальний вивід
-seen_place_ids = set()  # щоб не дублювати між точками/типами
+    def _claim(self, place_id: str) -> bool:
+        with self.lock:
+            if place_id in self.claimed:
+                return False
+            self.claimed.add(place_id)
+            return True
 
-for place_type in place_types:
-    for location in locations:
+    def _check_place(self, place_id: str):
+        # Жорсткий фільтр за областю/містом — тягнемо Place Details
+        details = self.client.fetch_place_details(place_id)
+        comps = details.get("address_components", [])
+        if not accept_kyiv_region_or_city(comps):
+            return
+        # Пройшло фільтр — додаємо
+        maps_link = f"https://www.google.com/maps/place/?q=place_id:{place_id}"
+        with self.lock:
+            self.results.add(maps_link)
+
+    def _sweep_cell(self, place_type: str, location: str, radius: int):
+        """Pages through one Nearby Search. Returns (results seen, Nearby Search calls spent)."""
+        calls_before = self.client.thread_calls
         params = {
             "location": location,
             "radius": radius,
             "type": place_type,
-            "key": API_KEY
+            "key": self.client.api_key
         }
-
-        data = nearby_page(params)
+        seen = 0
+        data = self.client.nearby_page(params)
         while True:
             for place in data.get("results", []):
+                seen += 1
                 place_id = place.get("place_id")
-                if not place_id or place_id in seen_place_ids:
+                if not place_id:
                     continue
 
                 # "мʼякий" фільтр по назві (виключення)
                 if name_excluded(place.get("name")):
                     continue
 
-                # Жорсткий фільтр за областю/містом — тягнемо Place Details
-                details = fetch_place_details(place_id)
-                comps = details.get("address_components", [])
-                if not accept_kyiv_region_or_city(comps):
-                    continue
-
-                # Пройшло фільтр — додаємо
-                maps_link = f"https://www.google.com/maps/place/?q=place_id:{place_id}"
-                results.add(maps_link)
-                seen_place_ids.add(place_id)
+                if self._claim(place_id):
+                    f = self.details_pool.submit(self._check_place, place_id)
+                    with self.lock:
+                        self.detail_futures.append(f)
 
             token = data.get("next_page_token")
             if not token:
                 break
 
             # При використанні pagetoken, Google вимагає тільки key + pagetoken
-            data = nearby_page({"pagetoken": token, "key": API_KEY})
+            data = self.client.nearby_page({"pagetoken": token, "key": self.client.api_key})
+
+        return seen, self.client.thread_calls - calls_before
+
+    def _record(self, place_type, cell, radius, seen, calls, action):
+        with self.lock:
+            self.cell_stats.append((place_type, str(cell), radius, seen, calls, action))
+        print(f"[INFO] {place_type} @ {cell} r={radius}m: {seen} results, {calls} calls{action and ' → ' + action}")
+
+    def _finish(self):
+        self.details_pool.shutdown(wait=True)
+        for f in self.detail_futures:
+            f.result()
+
+    def run(self, place_types, locations, radius: int) -> set:
+        """Fixed grid: every place type around every point in `locations`."""
+        def cell(place_type, location):
+            seen, calls = self._sweep_cell(place_type, location, radius)
+            self._record(place_type, location, radius, seen, calls, "capped" if seen >= RESULTS_CAP else "")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for f in [pool.submit(cell, t, loc) for t in place_types for loc in locations]:
+                    f.result()
+        finally:
+            self._finish()
+        return self.results
+
+    def _sweep_tile(self, place_type: str, tile: Tile):
+        """Searches one tile. Returns the child tiles to search next (empty if the tile is done)."""
+        if tile.radius > MAX_RADIUS:
+            return tile.split()  # too big for one request, split without spending a call
+        seen, calls = self._sweep_cell(place_type, tile.location, tile.radius)
+        if seen >= RESULTS_CAP and tile.radius > MIN_RADIUS:
+            self._record(place_type, tile, tile.radius, seen, calls, "split")
+            return tile.split()
+        self._record(place_type, tile, tile.radius, seen, calls, "capped" if seen >= RESULTS_CAP else "")
+        return []
+
+    def run_adaptive(self, place_types, bbox, outline) -> set:
+        """
+        Quadtree sweep: starts from `bbox`, splits any tile whose search hits the
+        60-result cap and never queries tiles that lie entirely outside `outline`.
+        """
+        skipped = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = {pool.submit(self._sweep_tile, t, Tile(*bbox)): t for t in place_types}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        place_type = pending.pop(f)
+                        for child in f.result():
+                            if tile_intersects(child, outline):
+                                pending[pool.submit(self._sweep_tile, place_type, child)] = place_type
+                            else:
+                                skipped += 1
+        finally:
+            self._finish()
+        print(f"[INFO] Adaptive grid: {len(self.cell_stats)} cells searched, {skipped} outside the region skipped")
+        return self.results
+
+    def write_report(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("place_type,cell,radius_m,results,calls,action\n")
+            for place_type, cell, radius, seen, calls, action in self.cell_stats:
+                f.write(f'{place_type},"{cell}",{radius},{seen},{calls},{action}\n')
+
+# ---------- main ----------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Collect Google Maps place links via the Places API.")
+    parser.add_argument("--output", default="kyiv_gov_links_only.txt", help="file to write links to")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_MAPS_API_KEY", API_KEY))
+    parser.add_argument("--api-base", default=API_BASE, help="Places API base URL (for a local mock server)")
+    parser.add_argument("--qps", type=float, default=10, help="max Places API requests per second")
+    parser.add_argument("--workers", type=int, default=8, help="grid cells swept in parallel")
+    parser.add_argument("--detail-workers", type=int, default=16, help="parallel Place Details lookups")
+    parser.add_argument("--grid", choices=["adaptive", "fixed"], default="adaptive",
+                        help="adaptive quadtree over REGION_BBOX, or the fixed `locations` × `radius` circles")
+    parser.add_argument("--tiles-report", help="CSV with results and API calls spent per cell")
+    parser.add_argument("--exclude-keywords", default=EXCLUDE_KEYWORDS_FILE, help="file with name exclusion keywords")
+    parser.add_argument("--cache", default="places_cache.sqlite3", help="Place Details cache file ('' to disable)")
+    parser.add_argument("--cache-ttl-days", type=float, default=30, help="how long cached details stay valid")
+    parser.add_argument("--cache-max-entries", type=int, default=200000, help="cache size cap (oldest evicted)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global exclude_matcher
+    args = parse_args(argv)
+    exclude_matcher = KeywordMatcher.from_file(args.exclude_keywords)
+    if not args.api_key and args.api_base == API_BASE:
+        print("Вкажіть API ключ: API_KEY, GOOGLE_MAPS_API_KEY або --api-key")
+        sys.exit(1)
+
+    cache = DetailsCache(args.cache, args.cache_ttl_days, args.cache_max_entries) if args.cache else None
+    client = PlacesClient(
+        args.api_key, qps=args.qps,
+        pool_size=args.workers + args.detail_workers, api_base=args.api_base, cache=cache,
+    )
+    start = time.time()
+    try:
+        sweep = Sweep(client, workers=args.workers, detail_workers=args.detail_workers)
+        if args.grid == "adaptive":
+            results = sweep.run_adaptive(place_types, REGION_BBOX, REGION_OUTLINE)
+        else:
+            results = sweep.run(place_types, locations, radius)
+        if args.tiles_report:
+            sweep.write_report(args.tiles_report)
+    finally:
+        if cache:
+            print(f"[INFO] Details cache: {cache.hits} hits, {cache.misses} misses")
+            cache.close()
 
-# ---------- save ----------
+    # ---------- save ----------
+    with open(args.output, "w", encoding="utf-8") as f:
+        for link in sorted(results):
+            f.write(link + "\n")
 
-output_path = "kyiv_gov_links_only.txt"
-with open(output_path, "w", encoding="utf-8") as f:
-    for link in sorted(results):
-        f.write(link + "\n")
+    print(f"Збережено {len(results)} унікальних посилань у '{args.output}' "
+          f"({client.calls} запитів до API, {time.time() - start:.1f}s)")
 
-print(f"Збережено {len(results)} унікальних посилань у '{output_path}'")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""
+Local stand-ins for the Google services the tools talk to, for offline testing.
+
+Usage:
+    python mock_server.py places [--port 8765] [--places 3000] [--qps-limit 20] [--over-query-rate 0.0]
+    python mock_server.py maps [--port 8766] [--fixtures DIR] [--throttle-qps 2]
+
+Then point links-generator.py at it:
+    python links-generator.py --api-base http://127.0.0.1:8765 --api-key test
+
+or scrape a fixture place page (N review cards, loaded lazily as the panel scrolls):
+    python google-maps-scraper.py "http://127.0.0.1:8766/maps/place/fixture-500/@50.4501,30.5234,17z"
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# ---------- mock Places API ----------
+
+PAGE_SIZE = 20
+MAX_PAGES = 3  # Nearby Search never returns more than 60 results
+
+# Roughly Kyiv Oblast; anything outside is reported as a neighbouring oblast.
+REGION_BBOX = (49.30, 29.30, 51.50, 32.10)
+WORLD_BBOX = (49.00, 29.00, 51.80, 32.40)
+
+PLACE_TYPES = ["local_government_office", "city_hall", "courthouse", "university"]
+NAME_TEMPLATES = [
+    "ЦНАП №{n}", "Сільська рада №{n}", "Районний суд №{n}", "Університет №{n}",
+    "Приватна клініка №{n}", "Адвокатське бюро №{n}", "Visa center {n}",
+]
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(a))
+
+def generate_places(count, seed=1):
+    rng = random.Random(seed)
+    places = []
+    for n in range(count):
+        lat = rng.uniform(WORLD_BBOX[0], WORLD_BBOX[2])
+        lng = rng.uniform(WORLD_BBOX[1], WORLD_BBOX[3])
+        in_region = REGION_BBOX[0] <= lat <= REGION_BBOX[2] and REGION_BBOX[1] <= lng <= REGION_BBOX[3]
+        places.append({
+            "place_id": "mock" + hashlib.sha1(str(n).encode()).hexdigest()[:16],
+            "name": rng.choice(NAME_TEMPLATES).format(n=n),
+            "lat": lat,
+            "lng": lng,
+            "types": rng.sample(PLACE_TYPES, rng.randint(1, 2)),
+            "oblast": "Kyiv Oblast" if in_region else "Zhytomyr Oblast",
+        })
+    return places
+
+
+class PlacesState:
+    def __init__(self, places, qps_limit=0, over_query_rate=0.0, token_delay=2.0, seed=1):
+        self.places = places
+        self.by_id = {p["place_id"]: p for p in places}
+        self.qps_limit = qps_limit
+        self.over_query_rate = over_query_rate
+        self.token_delay = token_delay
+        self.rng = random.Random(seed)
+        self.tokens = {}          # token -> (created_at, remaining results)
+        self.recent = deque()     # request timestamps in the last second
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def throttled(self):
+        """True if this request should get OVER_QUERY_LIMIT."""
+        with self.lock:
+            now = time.monotonic()
+            self.recent.append(now)
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+            if self.qps_limit and len(self.recent) > self.qps_limit:
+                return True
+            return self.rng.random() < self.over_query_rate
+
+    def nearby(self, qs):
+        token = qs.get("pagetoken")
+        if token:
+            with self.lock:
+                entry = self.tokens.get(token)
+            if not entry:
+                return {"status": "INVALID_REQUEST"}
+            created, remaining = entry
+            if time.monotonic() - created < self.token_delay:
+                return {"status": "INVALID_REQUEST"}
+            with self.lock:
+                self.tokens.pop(token, None)
+            return self._page(remaining)
+
+        try:
+            lat, lng = (float(v) for v in qs.get("location", "").split(","))
+            radius_km = float(qs.get("radius", 0)) / 1000
+        except ValueError:
+            return {"status": "INVALID_REQUEST"}
+        place_type = qs.get("type")
+        matches = [
+            (haversine_km(lat, lng, p["lat"], p["lng"]), p) for p in self.places
+            if (not place_type or place_type in p["types"])
+        ]
+        matches = [p for d, p in sorted(matches, key=lambda m: m[0]) if d <= radius_km]
+        return self._page(matches[:PAGE_SIZE * MAX_PAGES])
+
+    def _page(self, matches):
+        if not matches:
+            return {"status": "ZERO_RESULTS", "results": []}
+        page, rest = matches[:PAGE_SIZE], matches[PAGE_SIZE:]
+        data = {
+            "status": "OK",
+            "results": [
+                {
+                    "place_id": p["place_id"],
+                    "name": p["name"],
+                    "types": p["types"],
+                    "geometry": {"location": {"lat": p["lat"], "lng": p["lng"]}},
+                }
+                for p in page
+            ],
+        }
+        if rest:
+            token = hashlib.sha1(f"{time.monotonic()}{id(rest)}".encode()).hexdigest()
+            with self.lock:
+                self.tokens[token] = (time.monotonic(), rest)
+            data["next_page_token"] = token
+        return data
+
+    def details(self, qs):
+        p = self.by_id.get(qs.get("place_id", ""))
+        if not p:
+            return {"status": "NOT_FOUND"}
+        return {
+            "status": "OK",
+            "result": {
+                "name": p["name"],
+                "url": f"https://maps.google.com/?cid={p['place_id']}",
+                "address_components": [
+                    {"long_name": p["oblast"], "short_name": p["oblast"],
+                     "types": ["administrative_area_level_1", "political"]},
+                    {"long_name": "Ukraine", "short_name": "UA", "types": ["country", "political"]},
+                ],
+            },
+        }
+
+
+def make_places_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            qs = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            endpoint = parsed.path.rstrip("/").split("/")[-2:-1]
+            endpoint = endpoint[0] if endpoint else ""
+            if parsed.path == "/stats":
+                self._send(dict(state.stats))
+                return
+            with state.lock:
+                state.stats[endpoint] += 1
+            if endpoint not in ("nearbysearch", "details"):
+                self._send({"status": "INVALID_REQUEST"}, code=404)
+                return
+            if state.throttled():
+                with state.lock:
+                    state.stats["over_query_limit"] += 1
+                self._send({"status": "OVER_QUERY_LIMIT", "results": []})
+                return
+            self._send(state.nearby(qs) if endpoint == "nearbysearch" else state.details(qs))
+
+        def _send(self, payload, code=200):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def make_places_server(port=8765, places=3000, qps_limit=0, over_query_rate=0.0, token_delay=2.0, seed=1):
+    """Builds (but does not start) a mock Places server. Returns (server, state)."""
+    state = PlacesState(generate_places(places, seed), qps_limit, over_query_rate, token_delay, seed)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_places_handler(state))
+    server.daemon_threads = True
+    return server, state
+
+# ---------- mock Maps place pages ----------
+
+FIXTURE_BATCH = 10         # cards appended per scroll, like the real panel
+FIXTURE_LOAD_DELAY_MS = 80  # simulated XHR latency per batch
+
+AUTHORS = ["Іван Петренко", "Олена Коваль", "Андрій Шевченко", "Maria K.", "Dmytro S.", "Наталія Бондар"]
+DATE_PHRASES = ["тиждень тому", "3 тижні тому", "місяць тому", "2 місяці тому", "5 місяців тому",
+                "рік тому", "2 роки тому", "a month ago", "Змінено 3 дні тому", "4 роки тому"]
+SENTENCES = ["Зручно, швидко, персонал ввічливий.", "Довго чекали в черзі.", "Чудовий сервіс!",
+             "Працівники допомогли з документами.", "Не працює електронна черга.",
+             "Все зрозуміло і без зайвих питань.", "Дуже погано організовано прийом."]
+
+DAYS_AGO = {"тиждень тому": 7, "3 тижні тому": 21, "місяць тому": 30, "2 місяці тому": 61,
+            "5 місяців тому": 152, "рік тому": 365, "2 роки тому": 730, "a month ago": 30,
+            "Змінено 3 дні тому": 3, "4 роки тому": 1461}
+
+def generate_reviews(count, seed=1):
+    rng = random.Random(seed)
+    reviews = []
+    for i in range(count):
+        text = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 8)))
+        reviews.append({
+            "author": f"{rng.choice(AUTHORS)} #{i}",
+            "rating": rng.randint(1, 5),
+            "date": rng.choice(DATE_PHRASES),
+            "text": text if rng.random() > 0.05 else "",
+        })
+    return reviews
+
+def review_rpc_payload(reviews, offset, count, prefix=")]}'\n"):
+    """
+    One page of reviews shaped like a /maps/rpc/listugcposts response:
+    [null, next_token, [[entry], ...]] with entry[1] = metadata, entry[2] = rating/text.
+    """
+    now_us = int(time.time() * 1e6)
+    entries = []
+    for i in range(offset, min(offset + count, len(reviews))):
+        r = reviews[i]
+        meta = [None] * 7
+        meta[2] = now_us - DAYS_AGO.get(r["date"], 0) * 86400 * 10**6
+        meta[4] = [None] * 5 + [[r["author"]]]
+        meta[6] = r["date"]
+        body = [None] * 16
+        body[0] = [r["rating"]]
+        if r["text"]:
+            body[15] = [[r["text"]]]
+        entries.append([[f"rv{i}", meta, body]])
+    next_token = str(offset + count) if offset + count < len(reviews) else None
+    return prefix + json.dumps([None, next_token, entries], ensure_ascii=False)
+
+FIXTURE_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8">
+<title>{name} · Google Maps</title>
+<meta property="og:title" content="{name} · {address}">
+<meta property="og:image" content="https://maps.google.com/maps/api/staticmap?center={lat}%2C{lng}&amp;zoom=17">
+<link rel="canonical" href="https://www.google.com/maps/place/{slug}/@{lat},{lng},17z">
+<style>.m6QErb{{height:800px;overflow-y:auto}} .jftiEf{{padding:12px;border-bottom:1px solid #ddd}}</style>
+</head><body>
+<h1 class="DUwDvf" role="heading">{name}</h1>
+<button class="DkEaL">Центр надання адміністративних послуг</button>
+<button data-item-id="address">{address}</button>
+<button aria-label="Reviews for {name}" onclick="openReviews()">Reviews</button>
+<div class="m6QErb DxyBCb kA9KIf dS8AEf XiKgde" id="panel" style="display:none">
+  <button aria-label="Sort reviews" onclick="openSort()">Sort</button>
+  <div id="menu"></div>
+  <div id="cards"></div>
+</div>
+<script>
+const TOTAL = {total}, BATCH = {batch}, RPC = '/maps/rpc/listugcposts?fixture={total}';
+const panel = document.getElementById('panel'), list = document.getElementById('cards');
+let rendered = 0, loading = false, generation = 0;
+
+function esc(s) {{ const d = document.createElement('div'); d.textContent = s; return d.innerHTML; }}
+function card(r) {{
+  const long = r.text.length > 120;
+  const shown = long ? r.text.slice(0, 120) + '…' : r.text;
+  const el = document.createElement('div');
+  el.className = 'jftiEf';
+  el.innerHTML =
+    '<div class="d4r55">' + esc(r.author) + '</div>' +
+    '<span class="kvMYJc" role="img" aria-label="' + r.rating + ' stars"></span>' +
+    '<span class="rsqaWe">' + esc(r.date) + '</span>' +
+    (r.text ? '<div class="MyEned"><span class="wiI7pd">' + esc(shown) + '</span></div>' : '') +
+    (long ? '<button class="LkLjZd ScJHi OzU4dc">More</button>' : '');
+  const more = el.querySelector('button.LkLjZd');
+  if (more) more.onclick = () => {{ el.querySelector('span.wiI7pd').textContent = r.text; more.remove(); }};
+  return el;
+}}
+function fromEntry(e) {{
+  const r = e[0];
+  return {{author: r[1][4][5][0], date: r[1][6], rating: r[2][0][0], text: r[2][15] ? r[2][15][0][0] : ''}};
+}}
+function loadMore() {{
+  if (loading || rendered >= TOTAL) return;
+  loading = true;
+  const gen = generation;
+  fetch(RPC + '&offset=' + rendered + '&n=' + BATCH)
+    .then(res => res.text())
+    .then(body => {{
+      if (gen !== generation) return;
+      const frag = document.createDocumentFragment();
+      for (const e of JSON.parse(body.slice(body.indexOf('\\n') + 1))[2]) frag.appendChild(card(fromEntry(e)));
+      rendered += BATCH;
+      list.appendChild(frag);
+    }})
+    .finally(() => {{ loading = false; }});
+}}
+panel.addEventListener('scroll', () => {{
+  if (panel.scrollTop + panel.clientHeight >= panel.scrollHeight - 100) loadMore();
+}});
+function openReviews() {{ panel.style.display = 'block'; if (!rendered) loadMore(); }}
+function openSort() {{
+  const menu = document.getElementById('menu');
+  menu.innerHTML = '';
+  ['Most relevant', 'Newest', 'Highest rating', 'Lowest rating'].forEach((label, i) => {{
+    const item = document.createElement('div');
+    item.setAttribute('role', 'menuitemradio');
+    item.textContent = label;
+    item.onclick = () => {{
+      menu.innerHTML = ''; list.innerHTML = ''; rendered = 0; loading = false; generation++; loadMore();
+    }};
+    menu.appendChild(item);
+  }});
+}}
+</script>
+</body></html>
+"""
+
+def render_fixture_page(count):
+    """
+    Synthetic place page with `count` review cards, using the selectors the scraper
+    relies on. Cards are fetched page by page from the mock listugcposts endpoint.
+    """
+    name = f"ЦНАП Fixture {count}"
+    return FIXTURE_PAGE.format(
+        name=name,
+        slug=name.replace(" ", "+"),
+        address="вул. Хрещатик, 36, Київ, Київська область, 01044",
+        lat=50.4501, lng=30.5234,
+        total=count, batch=FIXTURE_BATCH,
+    )
+
+SORRY_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Sorry...</title></head><body>
+<div>Our systems have detected unusual traffic from your computer network.</div>
+<form id="captcha-form" action="/sorry/index" method="post"><div class="g-recaptcha"></div></form>
+</body></html>
+"""
+
+UNUSUAL_TRAFFIC_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Google Maps</title></head><body>
+<div class="m6QErb">Our systems have detected unusual traffic from your computer network. Please try again later.</div>
+</body></html>
+"""
+
+class MapsThrottle:
+    """
+    Simulated Google throttling for place pages. Above `qps_limit` pages/s
+    (averaged over `window` seconds), or at random with `rate`, a page is
+    answered with a CAPTCHA ("sorry") redirect or an unusual-traffic page, and
+    the client stays blocked for `penalty` seconds.
+    """
+    def __init__(self, qps_limit=0.0, rate=0.0, window=5.0, penalty=10.0, seed=1):
+        self.qps_limit = qps_limit
+        self.rate = rate
+        self.window = window
+        self.penalty = penalty
+        self.rng = random.Random(seed)
+        self.recent = deque()
+        self.blocked_until = 0.0
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def check(self):
+        """None to serve the page, else 'sorry' or 'unusual'."""
+        with self.lock:
+            now = time.monotonic()
+            self.recent.append(now)
+            while self.recent and now - self.recent[0] > self.window:
+                self.recent.popleft()
+            over = self.qps_limit and len(self.recent) / self.window > self.qps_limit
+            if over:
+                self.blocked_until = now + self.penalty
+            blocked = now < self.blocked_until or self.rng.random() < self.rate
+            self.stats["pages"] += 1
+            if not blocked:
+                return None
+            kind = self.rng.choice(["sorry", "unusual"])
+            self.stats[kind] += 1
+            return kind
+
+def make_maps_handler(fixtures_dir=None, throttle=None):
+    pages = {}
+    reviews = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            path = parsed.path
+            if path == "/stats":
+                self._send(json.dumps(dict(throttle.stats) if throttle else {}).encode("utf-8"),
+                           "application/json; charset=utf-8")
+                return
+            if path.startswith("/sorry/"):
+                self._send(SORRY_PAGE.encode("utf-8"))
+                return
+            if throttle and path.startswith("/maps/place/"):
+                blocked = throttle.check()
+                if blocked == "sorry":
+                    self.send_response(302)
+                    self.send_header("Location", "/sorry/index?continue=" + self.path)
+                    self.end_headers()
+                    return
+                if blocked == "unusual":
+                    self._send(UNUSUAL_TRAFFIC_PAGE.encode("utf-8"))
+                    return
+            if path == "/maps/rpc/listugcposts":
+                qs = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                count = int(qs.get("fixture", 0))
+                with lock:
+                    if count not in reviews:
+                        reviews[count] = generate_reviews(count)
+                time.sleep(FIXTURE_LOAD_DELAY_MS / 1000)
+                payload = review_rpc_payload(reviews[count], int(qs.get("offset", 0)), int(qs.get("n", FIXTURE_BATCH)))
+                self._send(payload.encode("utf-8"), "application/json; charset=utf-8")
+                return
+            m = re.search(r"fixture-(\d+)", path)
+            if m:
+                count = int(m.group(1))
+                with lock:
+                    if count not in pages:
+                        pages[count] = render_fixture_page(count).encode("utf-8")
+                self._send(pages[count])
+                return
+            # Recorded pages: /maps/place/<name> -> <fixtures_dir>/<name>.html
+            if fixtures_dir:
+                name = os.path.basename(path.rstrip("/").split("/@")[0]) or "index"
+                file_path = os.path.join(fixtures_dir, name if name.endswith(".html") else name + ".html")
+                if os.path.isfile(file_path):
+                    with open(file_path, "rb") as f:
+                        self._send(f.read())
+                    return
+            self.send_error(404)
+
+        def _send(self, body, content_type="text/html; charset=utf-8"):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def make_maps_server(port=8766, fixtures_dir=None, throttle=None):
+    """Builds (but does not start) a server for fixture place pages, optionally throttled (a MapsThrottle)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_maps_handler(fixtures_dir, throttle))
+    server.daemon_threads = True
+    return server
+
+# ---------- main ----------
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock servers for offline testing.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("places", help="mock Places API (nearbysearch + details)")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--places", type=int, default=3000, help="number of synthetic places")
+    p.add_argument("--qps-limit", type=int, default=0, help="answer OVER_QUERY_LIMIT above this rate (0 = off)")
+    p.add_argument("--over-query-rate", type=float, default=0.0, help="fraction of random OVER_QUERY_LIMIT answers")
+    p.add_argument("--token-delay", type=float, default=2.0, help="seconds before a next_page_token is valid")
+
+    p = sub.add_parser("maps", help="fixture place pages: /maps/place/fixture-<N> has N review cards")
+    p.add_argument("--port", type=int, default=8766)
+    p.add_argument("--fixtures", help="directory of recorded place pages (<name>.html) to serve as well")
+    p.add_argument("--throttle-qps", type=float, default=0.0, help="answer CAPTCHA / unusual-traffic pages above this many place pages/s (0 = off)")
+    p.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of place pages throttled at random")
+    p.add_argument("--throttle-penalty", type=float, default=10.0, help="seconds a client stays blocked after exceeding --throttle-qps")
+
+    args = parser.parse_args()
+    if args.command == "maps":
+        throttle = None
+        if args.throttle_qps or args.throttle_rate:
+            throttle = MapsThrottle(args.throttle_qps, args.throttle_rate, penalty=args.throttle_penalty)
+        server = make_maps_server(args.port, args.fixtures, throttle)
+        print(f"[INFO] Mock Maps pages on http://127.0.0.1:{args.port}/maps/place/fixture-500/@50.4501,30.5234,17z")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    server, state = make_places_server(
+        args.port, args.places, args.qps_limit, args.over_query_rate, args.token_delay
+    )
+    print(f"[INFO] Mock Places API on http://127.0.0.1:{args.port} ({len(state.places)} places)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"[INFO] Requests served: {dict(state.stats)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from support import scraper
+
+
+def review(i, organization="ЦНАП Київ"):
+    return {"organization": organization, "author": f"Автор {i}", "rating": "5", "date": "тиждень тому",
+            "content": f"Відгук {i}: \"дужки\" [], {{}}, коми, \\ і ✓", "fingerprint": f"fp{i}"}
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "combined.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_items_spanning_chunks(self):
+        records = [review(i) for i in range(5000)]
+        self.write(json.dumps(records, ensure_ascii=False, indent=2))
+        for chunk_size in (7, 1000, 1 << 20):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(scraper.iter_json_array(self.path, chunk_size)), records)
+
+    def test_empty_list(self):
+        self.write(" [\n]\n")
+        self.assertEqual(list(scraper.iter_json_array(self.path)), [])
+
+    def test_damaged_tail_and_non_list(self):
+        self.write('[{"a": 1}, {"b": 2}, {"c":')
+        items = scraper.iter_json_array(self.path, chunk_size=4)
+        self.assertEqual([next(items), next(items)], [{"a": 1}, {"b": 2}])
+        with self.assertRaises(ValueError):
+            next(items)
+        self.write('{"a": 1}')
+        with self.assertRaises(ValueError):
+            list(scraper.iter_json_array(self.path))
+
+
+class CompactReviewsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.jsonl = os.path.join(self.tmp, "reviews.jsonl")
+        self.combined = os.path.join(self.tmp, "combined.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def append(self, records):
+        with open(self.jsonl, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+
+    def load(self):
+        with open(self.combined, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_merges_and_drops_duplicates(self):
+        self.append([review(i) for i in range(3)])
+        self.assertEqual(scraper.compact_reviews(self.jsonl, self.combined), 3)
+        self.assertFalse(os.path.exists(self.jsonl))
+
+        # A retried place repeats reviews; the same review at another place is kept
+        self.append([review(2), review(3), review(3), review(1, "ЦНАП Львів")])
+        self.assertEqual(scraper.compact_reviews(self.jsonl, self.combined), 5)
+        self.assertEqual(self.load(), [review(0), review(1), review(2), review(3), review(1, "ЦНАП Львів")])
+
+    def test_rerun_after_crash_before_jsonl_removed(self):
+        self.append([review(i) for i in range(4)])
+        shutil.copy(self.jsonl, self.jsonl + ".bak")
+        scraper.compact_reviews(self.jsonl, self.combined)
+        os.replace(self.jsonl + ".bak", self.jsonl)
+        self.assertEqual(scraper.compact_reviews(self.jsonl, self.combined), 4)
+        self.assertEqual(len(self.load()), 4)
+
+    def test_directory_output_rejected(self):
+        with self.assertRaises(SystemExit):
+            scraper.parse_args(["--compact", "--format", "parquet"])
+        with self.assertRaises(SystemExit):
+            scraper.parse_args(["--compact", "--output", self.tmp])
+
+
+if __name__ == "__main__":
+    unittest.main()
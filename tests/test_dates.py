@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime
+
+from support import scraper
+
+NOW = datetime(2024, 3, 15, 1, 0)
+
+# (review date text, expected date with NOW as the clock)
+CASES = [
+    ("today", "2024-03-15"), ("сьогодні", "2024-03-15"), ("сегодня", "2024-03-15"),
+    ("yesterday", "2024-03-14"), ("вчора", "2024-03-14"), ("вчера", "2024-03-14"),
+    ("just now", "2024-03-15"), ("щойно", "2024-03-15"), ("только что", "2024-03-15"),
+    ("5 minutes ago", "2024-03-15"), ("5 хвилин тому", "2024-03-15"), ("5 минут назад", "2024-03-15"),
+    # 23 hours before 01:00 is yesterday, not today
+    ("23 hours ago", "2024-03-14"), ("23 години тому", "2024-03-14"), ("23 часа назад", "2024-03-14"),
+    ("an hour ago", "2024-03-15"), ("годину тому", "2024-03-15"), ("час назад", "2024-03-15"),
+    ("a day ago", "2024-03-14"), ("день тому", "2024-03-14"), ("день назад", "2024-03-14"),
+    ("3 days ago", "2024-03-12"), ("3 дні тому", "2024-03-12"), ("3 дня назад", "2024-03-12"),
+    ("a week ago", "2024-03-08"), ("тиждень тому", "2024-03-08"), ("неделю назад", "2024-03-08"),
+    ("2 weeks ago", "2024-03-01"), ("2 тижні тому", "2024-03-01"), ("2 недели назад", "2024-03-01"),
+    ("last week", "2024-03-08"), ("минулого тижня", "2024-03-08"), ("на прошлой неделе", "2024-03-08"),
+    ("a month ago", "2024-02-15"), ("місяць тому", "2024-02-15"), ("месяц назад", "2024-02-15"),
+    ("5 months ago", "2023-10-15"), ("5 місяців тому", "2023-10-15"), ("5 месяцев назад", "2023-10-15"),
+    ("a year ago", "2023-03-15"), ("рік тому", "2023-03-15"), ("год назад", "2023-03-15"),
+    ("2 years ago", "2022-03-15"), ("2 роки тому", "2022-03-15"), ("2 года назад", "2022-03-15"),
+    ("Edited 3 days ago", "2024-03-12"), ("Змінено 3 дні тому", "2024-03-12"),
+]
+
+
+def resolve(text, now=NOW):
+    rule = scraper.resolve_date_text(scraper.clean_date_text(text))
+    return scraper.apply_date_rule(rule, now).strftime("%Y-%m-%d") if rule else "Unknown"
+
+
+class DateRuleTest(unittest.TestCase):
+    def test_rules_against_fixed_now(self):
+        for text, expected in CASES:
+            with self.subTest(text=text):
+                self.assertEqual(resolve(text), expected)
+
+    def test_month_end_is_clamped(self):
+        self.assertEqual(resolve("a month ago", datetime(2024, 3, 31, 12, 0)), "2024-02-29")
+
+    def test_absolute_date(self):
+        self.assertEqual(resolve("12.03.2021"), "2021-03-12")
+
+    def test_base_dependent_phrase_is_not_frozen_in_cache(self):
+        # No year: the answer depends on the clock, so it must not be cached as a fixed date
+        self.assertEqual(resolve("5 лютого"), "2024-02-05")
+        self.assertEqual(resolve("5 лютого", datetime(2025, 6, 1)), "2025-02-05")
+
+    def test_unparseable(self):
+        self.assertEqual(resolve("qwerty"), "Unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
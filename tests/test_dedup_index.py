@@ -0,0 +1,77 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dedup_index import BloomFilter, ReviewIndex, review_key
+
+
+class ReviewKeyTest(unittest.TestCase):
+    def test_organization_is_part_of_the_key(self):
+        self.assertNotEqual(review_key("Школа №1", "abc"), review_key("Школа №2", "abc"))
+        self.assertNotEqual(review_key("Школа №1", "abc"), review_key("Школа №1", "abd"))
+
+    def test_organization_spacing_and_case_ignored(self):
+        self.assertEqual(review_key("  Школа   №1 ", "abc"), review_key("школа №1", "abc"))
+
+
+class ReviewIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "index", "reviews.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_seen_add_round_trip_across_reopen(self):
+        index = ReviewIndex(self.path, capacity=1000)
+        keys = [review_key("place", f"fp-{i}") for i in range(100)]
+        self.assertFalse(any(index.seen(k) for k in keys))
+        self.assertEqual(index.add(keys), 100)
+        self.assertEqual(index.add(keys[:10]), 0)
+        index.close()
+
+        index = ReviewIndex(self.path, capacity=1000)
+        self.assertEqual(index.rows, 100)
+        self.assertTrue(all(index.seen(k) for k in keys))
+        self.assertFalse(index.seen(review_key("other place", "fp-0")))
+        index.close()
+
+    def test_filter_rebuilt_after_unclean_exit(self):
+        index = ReviewIndex(self.path, capacity=1000)
+        index.add([1, 2, 3])
+        index.close()
+        index = ReviewIndex(self.path, capacity=1000)
+        index.add([4, 5])
+        index._conn.close()  # no close(): the saved filter only covers the first three
+        index = ReviewIndex(self.path, capacity=1000)
+        self.assertTrue(all(index.seen(k) for k in [1, 2, 3, 4, 5]))
+        index.close()
+
+    def test_no_false_negatives_past_capacity(self):
+        # Filter sized for 100 keys, filled with 5000: more false positives, never a miss
+        index = ReviewIndex(self.path, capacity=100)
+        keys = [review_key("place", f"fp-{i}") for i in range(5000)]
+        index.add(keys)
+        self.assertTrue(all(k in index.bloom for k in keys))
+        self.assertTrue(all(index.seen(k) for k in keys))
+        index.close()
+
+    def test_bloom_save_load(self):
+        bloom = BloomFilter(capacity=500)
+        for k in range(-250, 250):
+            bloom.add(k)
+        path = os.path.join(self.tmp, "f.bloom")
+        bloom.save(path, 500)
+        loaded, rows = BloomFilter.load(path)
+        self.assertEqual(rows, 500)
+        self.assertTrue(all(k in loaded for k in range(-250, 250)))
+        with open(path, "r+b") as f:
+            f.truncate(20)
+        self.assertEqual(BloomFilter.load(path), (None, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import keyword_matcher
+from keyword_matcher import KeywordMatcher
+
+BACKENDS = ["python"] + (["c"] if keyword_matcher.ahocorasick else [])
+
+
+def expected(keywords, text):
+    """The keyword ending earliest in text; the longest of those ending there."""
+    best = None
+    for k in set(keywords):
+        ends = [i + len(k) for i in range(len(text)) if text.startswith(k, i)]
+        if ends and (best is None or (min(ends), -len(k)) < best[0]):
+            best = ((min(ends), -len(k)), k)
+    return best[1] if best else None
+
+
+class KeywordMatcherTest(unittest.TestCase):
+    def test_reports_matched_keyword(self):
+        for backend in BACKENDS:
+            m = KeywordMatcher(["he", "she", "his", "hers", "Приватна школа"], backend)
+            self.assertEqual(m.search("ushers"), "she")
+            self.assertEqual(m.search("ahis"), "his")
+            self.assertEqual(m.search("ПРИВАТНА ШКОЛА №1"), "приватна школа")
+            self.assertIsNone(m.search("xyz"))
+            self.assertIn("hershey", m)
+
+    def test_empty(self):
+        for backend in BACKENDS:
+            self.assertIsNone(KeywordMatcher([], backend).search("anything"))
+            self.assertIsNone(KeywordMatcher(["a"], backend).search(""))
+
+    def test_agrees_with_naive_scan(self):
+        rng = random.Random(3)
+        keywords = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 5))) for _ in range(40)]
+        texts = ["".join(rng.choice("abcd") for _ in range(rng.randint(0, 12))) for _ in range(3000)]
+        for backend in BACKENDS:
+            m = KeywordMatcher(keywords, backend)
+            for text in texts:
+                self.assertEqual(m.search(text), expected(keywords, text), (backend, text))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import scraper
+
+PLACE = "https://www.google.com/maps/place/School/data=!4m6!3m5!1s0x40d4cf4ee15a4505:0x8eaddfcd1b32ca52!8m2"
+SHORT = "https://maps.app.goo.gl/abc123"
+CID = 0x8eaddfcd1b32ca52
+
+# One place reached through every URL form the input lists contain
+SAME_PLACE = [
+    PLACE,
+    f"https://maps.google.com/?cid={CID}",
+    f"https://www.google.com/maps?ludocid={CID}&hl=uk",
+    "https://www.google.com/maps?ftid=0x40d4cf4ee15a4505:0x8eaddfcd1b32ca52",
+    "https://www.google.com/maps/place/?q=place_id:ChIJBUVa4U7P1EARUsoyG83frY4",
+    "https://www.google.com/maps/search/?api=1&query=School&query_place_id=ChIJBUVa4U7P1EARUsoyG83frY4",
+]
+
+
+class PlaceKeyTest(unittest.TestCase):
+    def test_url_forms_share_a_key(self):
+        for url in SAME_PLACE:
+            with self.subTest(url=url):
+                self.assertEqual(scraper.place_key(url), f"cid:{CID}")
+
+    def test_other_places_and_unknown_forms(self):
+        self.assertEqual(scraper.place_key("https://maps.google.com/?cid=42"), "cid:42")
+        self.assertEqual(scraper.place_key("https://www.google.com/maps/place/?q=place_id:GhIJQWDl0CIeQUAR"),
+                         "place_id:GhIJQWDl0CIeQUAR")
+        self.assertEqual(scraper.place_key("https://www.google.com/maps/place/School"),
+                         "https://www.google.com/maps/place/School")
+
+    def test_work_list_folds_short_link_into_its_place(self):
+        tmp = tempfile.mkdtemp()
+        ledger = scraper.Ledger(os.path.join(tmp, "ledger.sqlite3"))
+        ledger.save_expansion(SHORT, PLACE)  # cached: no network needed
+        try:
+            work = scraper.build_work_list([SHORT] + SAME_PLACE, ledger, workers=1, path=None)
+        finally:
+            ledger.close()
+            shutil.rmtree(tmp)
+        self.assertEqual(work, [(SHORT, PLACE)])
+
+
+class LedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "ledger.sqlite3")
+        self.ledger = scraper.Ledger(self.path)
+
+    def tearDown(self):
+        self.ledger.close()
+        shutil.rmtree(self.tmp)
+
+    def reopen(self):
+        self.ledger.close()
+        self.ledger = scraper.Ledger(self.path)
+
+    def test_done_place_skipped_on_reopen(self):
+        self.ledger.mark_done(PLACE, SHORT, 12)
+        self.reopen()
+        self.assertTrue(self.ledger.is_done(PLACE))
+        self.assertTrue(self.ledger.is_done(SHORT))  # by the link it was listed under
+        self.assertEqual(self.ledger.summary(), {"done": 1})
+
+    def test_failed_and_partial_are_retried(self):
+        other = "https://maps.google.com/?cid=42"
+        self.ledger.mark_failed(PLACE, PLACE, "timeout")
+        self.ledger.mark_partial(other, other, 30, "stopped after 300s")
+        self.reopen()
+        self.assertFalse(self.ledger.is_done(PLACE))
+        self.assertFalse(self.ledger.is_done(other))
+        self.assertEqual(self.ledger.summary(), {"failed": 1, "partial": 1})
+
+        self.ledger.mark_done(other, other, 80)
+        self.assertTrue(self.ledger.is_done(other))
+        attempts = self.ledger._conn.execute("SELECT attempts FROM places WHERE status = 'done'").fetchone()
+        self.assertEqual(attempts, (2,))
+
+    def test_fingerprints_kept_per_place(self):
+        self.ledger.add_fingerprints(PLACE, ["a", "b"])
+        self.ledger.add_fingerprints(PLACE, ["b", "c"])
+        self.reopen()
+        self.assertEqual(self.ledger.known_fingerprints(PLACE), {"a", "b", "c"})
+        self.assertEqual(self.ledger.known_fingerprints("https://maps.google.com/?cid=42"), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
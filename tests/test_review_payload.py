@@ -0,0 +1,46 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from support import scraper
+import mock_server
+
+
+class ReviewPayloadTest(unittest.TestCase):
+    def setUp(self):
+        self.reviews = mock_server.generate_reviews(25, seed=4)
+
+    def test_mock_listugcposts_page(self):
+        cards = scraper.parse_review_payload(mock_server.review_rpc_payload(self.reviews, 10, 10))
+        self.assertEqual(len(cards), 10)
+        for i, (card, review) in enumerate(zip(cards, self.reviews[10:20]), start=10):
+            with self.subTest(i=i):
+                self.assertEqual(card["id"], f"rv{i}")
+                self.assertEqual(card["author"], review["author"])
+                self.assertEqual(card["rating"], str(review["rating"]))
+                self.assertEqual(card["content"], review["text"])
+                self.assertEqual(card["date"], review["date"])
+                published = datetime.now() - timedelta(days=mock_server.DAYS_AGO[review["date"]])
+                self.assertEqual(card["published"], published.strftime("%Y-%m-%d"))
+
+    def test_last_page_and_no_prefix(self):
+        cards = scraper.parse_review_payload(mock_server.review_rpc_payload(self.reviews, 20, 10, prefix=""))
+        self.assertEqual([c["id"] for c in cards], [f"rv{i}" for i in range(20, 25)])
+
+    def test_review_without_text(self):
+        review = dict(self.reviews[0], text="")
+        card = scraper.parse_review_payload(mock_server.review_rpc_payload([review], 0, 1))[0]
+        self.assertEqual(card["content"], "")
+        self.assertEqual(card["author"], review["author"])
+
+    def test_unknown_layout(self):
+        self.assertIsNone(scraper.parse_review_payload("not json"))
+        self.assertIsNone(scraper.parse_review_payload(json.dumps({"reviews": []})))
+        # A rating outside 1-5 means the layout guess is wrong, not a review
+        payload = json.loads(mock_server.review_rpc_payload(self.reviews, 0, 2)[len(")]}'\n"):])
+        payload[2][1][0][2][0] = [7]
+        self.assertIsNone(scraper.parse_review_payload(json.dumps(payload)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from throttle import ThrottleScheduler, classify_throttle
+import mock_server
+
+
+def run(scheduler, results, worker_id=1):
+    """Feeds a sequence of place results (True = throttled) through one worker, skipping its pauses."""
+    for throttled in results:
+        scheduler.resume_at.pop(worker_id, None)
+        scheduler.acquire(worker_id)
+        scheduler.release(worker_id, throttled)
+
+
+class ThrottleSchedulerTest(unittest.TestCase):
+    def test_throttle_halves_concurrency_and_successes_restore_it(self):
+        # cooldown=0: no pauses, and every throttle event may cut
+        scheduler = ThrottleScheduler(8, cooldown=0)
+        run(scheduler, [True])
+        self.assertEqual(scheduler.allowed, 4)
+        run(scheduler, [True, True, True])
+        self.assertEqual(scheduler.allowed, 1)
+
+        allowed = [scheduler.allowed]
+        for _ in range(40):
+            run(scheduler, [False])
+            allowed.append(scheduler.allowed)
+        self.assertEqual(allowed[:3], [1, 2, 2.5])
+        self.assertEqual(allowed, sorted(allowed))  # additive increase only
+        self.assertEqual(scheduler.allowed, 8)      # capped at the worker count
+        self.assertEqual(scheduler.summary()["throttle_events"], 4)
+
+    def test_one_cut_per_burst(self):
+        # Places in flight when the block starts fail together; that is one signal
+        scheduler = ThrottleScheduler(8, cooldown=1000)
+        for worker_id in range(1, 5):
+            scheduler.active += 1
+            scheduler.release(worker_id, True)
+        self.assertEqual(scheduler.allowed, 4)
+
+    def test_worker_delay_doubles_and_decays(self):
+        scheduler = ThrottleScheduler(2, cooldown=0)
+        run(scheduler, [True])
+        self.assertEqual(scheduler.delay[1], 1.0)
+        run(scheduler, [True])
+        self.assertEqual(scheduler.delay[1], 2.0)
+        scheduler.active += 1
+        scheduler.release(1, False)
+        self.assertAlmostEqual(scheduler.delay[1], 1.7)
+        self.assertNotIn(2, scheduler.delay)  # other workers keep their pace
+
+    def test_acquire_blocks_at_the_limit(self):
+        scheduler = ThrottleScheduler(4, cooldown=0)
+        scheduler.allowed = 1.0
+        scheduler.acquire(1)
+        started = threading.Event()
+
+        def second():
+            scheduler.acquire(2)
+            started.set()
+
+        threading.Thread(target=second, daemon=True).start()
+        self.assertFalse(started.wait(0.2))
+        scheduler.release(1, None)
+        self.assertTrue(started.wait(2))
+
+    def test_release_without_result_records_nothing(self):
+        scheduler = ThrottleScheduler(4, cooldown=0)
+        scheduler.acquire(1)
+        scheduler.release(1, None)
+        self.assertEqual(scheduler.active, 0)
+        self.assertEqual(len(scheduler.window), 0)
+        self.assertEqual(scheduler.allowed, 4)
+
+    def test_should_retry_limit(self):
+        scheduler = ThrottleScheduler(1, max_retries=2)
+        self.assertEqual([scheduler.should_retry(7) for _ in range(3)], [True, True, False])
+        self.assertTrue(scheduler.should_retry(8))
+
+    def test_success_rate_window(self):
+        scheduler = ThrottleScheduler(4, window=4, cooldown=0)
+        run(scheduler, [False, False, False, True])
+        self.assertEqual(scheduler.success_rate(), 0.75)
+        run(scheduler, [False])
+        self.assertEqual(scheduler.success_rate(), 0.75)  # oldest result dropped
+
+
+class ClassifyThrottleTest(unittest.TestCase):
+    def test_mock_throttle_pages(self):
+        sorry = mock_server.SORRY_PAGE
+        self.assertEqual(classify_throttle("https://www.google.com/sorry/index?continue=x", sorry,
+                                           'id="captcha-form"' in sorry), "captcha")
+        self.assertEqual(classify_throttle("http://127.0.0.1/maps/place/x", sorry, True), "captcha")
+        self.assertEqual(classify_throttle("http://127.0.0.1/maps/place/x", mock_server.UNUSUAL_TRAFFIC_PAGE),
+                         "unusual traffic")
+        self.assertEqual(classify_throttle("https://consent.google.com/ml?continue=x"), "consent wall")
+
+    def test_place_page_is_not_throttled(self):
+        page = mock_server.render_fixture_page(20)
+        self.assertIsNone(classify_throttle("http://127.0.0.1/maps/place/fixture-20", page, False, True))
+        # A review quoting the interstitial does not turn a place page into one
+        quoted = page + "<div>Писали, що «незвичайний трафік», але все ок</div>"
+        self.assertIsNone(classify_throttle("http://127.0.0.1/maps/place/fixture-20", quoted, False, True))
+
+    def test_everyday_phrases_not_flagged(self):
+        for text in ["Персонал не робота, а мрія", "Не роботу шукав, а довідку", "a robot could do this faster"]:
+            self.assertIsNone(classify_throttle("http://127.0.0.1/maps/place/x", text), text)
+        self.assertEqual(classify_throttle("", "Підтвердіть, що я не робот"), "unusual traffic")
+
+
+if __name__ == "__main__":
+    unittest.main()
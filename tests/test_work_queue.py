@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from work_queue import TaskQueue, make_queue_server, RemoteTaskQueue
+from support import scraper
+
+LEASE = 0.2
+
+
+class TaskQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.queue = TaskQueue(os.path.join(self.tmp, "queue.sqlite3"), lease_seconds=LEASE, max_attempts=2)
+        self.queue.add([("short-a", "https://maps/a"), ("short-b", "https://maps/b")])
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.tmp)
+
+    def test_add_ignores_known_keys(self):
+        self.assertEqual(self.queue.add([("again", "https://maps/a"), ("new", "https://maps/c")]), 1)
+        self.assertEqual(self.queue.stats()["pending"], 3)
+
+    def test_expired_lease_is_requeued(self):
+        first = self.queue.lease("w1")[0]
+        time.sleep(LEASE * 1.5)
+        again = self.queue.lease("w2", limit=2)
+        self.assertEqual([t["id"] for t in again], [first["id"], first["id"] + 1])
+        self.assertEqual(again[0]["attempt"], 2)
+        # w1 lost the lease; its late result must not overwrite w2's work
+        self.assertFalse(self.queue.complete("w1", first["id"], "done", 5))
+        self.assertTrue(self.queue.complete("w2", first["id"], "done", 5))
+
+    def test_max_attempts_marks_failed(self):
+        self.queue.lease("w1", limit=2)
+        time.sleep(LEASE * 1.5)
+        self.queue.lease("w1", limit=2)
+        time.sleep(LEASE * 1.5)
+        self.assertEqual(self.queue.lease("w1"), [])
+        stats = self.queue.stats()
+        self.assertEqual(stats["failed"], 2)
+        self.assertEqual(stats["remaining"], 0)
+
+    def test_heartbeat_keeps_lease(self):
+        task = self.queue.lease("w1")[0]
+        for _ in range(3):
+            time.sleep(LEASE * 0.6)
+            self.assertEqual(self.queue.heartbeat("w1", [task["id"]]), [task["id"]])
+        other = self.queue.lease("w2", limit=2)
+        self.assertNotIn(task["id"], [t["id"] for t in other])
+        self.assertEqual(self.queue.heartbeat("w2", [task["id"]]), [])
+
+    def test_release_returns_task(self):
+        task = self.queue.lease("w1")[0]
+        self.assertTrue(self.queue.release("w1", task["id"]))
+        self.assertEqual(self.queue.lease("w2")[0]["id"], task["id"])
+
+
+class QueueWorkerTest(unittest.TestCase):
+    def test_task_that_raises_is_failed_not_held(self):
+        tmp = tempfile.mkdtemp()
+        backend = TaskQueue(os.path.join(tmp, "queue.sqlite3"), lease_seconds=LEASE)
+        backend.add([("short-a", "https://maps/a"), ("short-b", "https://maps/b")])
+        original = scraper.process_task
+
+        def broken(*args, **kwargs):
+            raise OSError(28, "No space left on device")
+
+        scraper.process_task = broken
+        try:
+            scraper.run_queue_workers(backend, None, {}, scraper.job_settings(), workers=1)
+        finally:
+            scraper.process_task = original
+        # Both tasks were reported failed (none left leased and heartbeated forever)
+        self.assertEqual(backend.stats(), {"failed": 2, "remaining": 0})
+        backend.close()
+        shutil.rmtree(tmp)
+
+
+class QueueServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.queue = TaskQueue(os.path.join(self.tmp, "queue.sqlite3"), lease_seconds=LEASE)
+        self.queue.add([("short-a", "https://maps/a")])
+        self.queue.set_job(max_reviews=50)
+        self.server = make_queue_server(self.queue, "127.0.0.1", 0, token="secret")
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.queue.close()
+        shutil.rmtree(self.tmp)
+
+    def test_remote_round_trip(self):
+        client = RemoteTaskQueue(self.base, token="secret", retries=1)
+        self.assertEqual(client.job(), {"max_reviews": 50})
+        task = client.lease("host-1")[0]
+        self.assertEqual(task["url"], "https://maps/a")
+        self.assertTrue(client.complete("host-1", task["id"], "done", 12))
+        self.assertEqual(client.stats()["done"], 1)
+        client.close()
+
+    def test_token_required(self):
+        self.assertEqual(requests.post(f"{self.base}/stats", json={}).status_code, 401)
+        wrong = {"Authorization": "Bearer secreT"}
+        self.assertEqual(requests.post(f"{self.base}/stats", json={}, headers=wrong).status_code, 401)
+
+    def test_no_open_bind_without_token(self):
+        with self.assertRaises(ValueError):
+            make_queue_server(self.queue, "0.0.0.0", 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Throttle detection and adaptive pacing for the worker pool.
+
+classify_throttle() names the signal a page shows when Google is throttling
+(CAPTCHA, unusual-traffic interstitial, consent wall). ThrottleScheduler is the
+AIMD limiter shared by all workers: a throttle signal halves how many browsers
+may work at once and slows the worker that hit it; successes add slots back.
+
+    scheduler = ThrottleScheduler(workers=8, cooldown=30)
+    scheduler.acquire(worker_id)             # before starting a place
+    scheduler.release(worker_id, throttled)  # True / False, or None to record nothing
+"""
+import re
+import time
+import random
+import threading
+from collections import deque
+
+# Only the interstitial's own phrases: reviews say "не робота" / "не роботу" all the time.
+THROTTLE_TEXT = re.compile(
+    r"\b(?:unusual traffic from your computer network|i'?m not a robot|я не робот"
+    r"|незвичайний трафік|необычный трафик)\b", re.I
+)
+
+
+def classify_throttle(url, text="", captcha=False, place_page=False):
+    """
+    Name of the throttling signal shown by a page, or None. The page text is only
+    checked when no place heading is shown (place_page), as reviews can quote anything.
+    """
+    if captcha or "/sorry/" in (url or ""):
+        return "captcha"
+    if not place_page and THROTTLE_TEXT.search(text or ""):
+        return "unusual traffic"
+    if "consent.google." in (url or ""):
+        return "consent wall"
+    return None
+
+
+class ThrottleScheduler:
+    """
+    AIMD pacing shared by all workers. Every place result goes into a sliding
+    window. A throttle signal halves the number of browsers allowed to work at
+    once and doubles the delay between places of the worker that hit it (plus a
+    cooldown for that worker); each success adds back 1/allowed of a slot and
+    trims the delay. Throttled places are requeued up to max_retries times.
+    """
+    def __init__(self, workers, window=50, min_delay=0.0, max_delay=120.0, cooldown=30.0, max_retries=5):
+        self.max_workers = max(1, workers)
+        self.allowed = float(self.max_workers)
+        self.window = deque(maxlen=window)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.cooldown = cooldown
+        self.max_retries = max_retries
+        self.delay = {}        # worker -> seconds between its places
+        self.resume_at = {}    # worker -> earliest next start
+        self.retries = {}      # task idx -> throttled retries so far
+        self.active = 0
+        self.throttle_events = 0
+        self.last_cut = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, worker_id):
+        """Blocks until this worker may start its next place."""
+        with self._cond:
+            while self.active >= max(1, int(self.allowed)):
+                self._cond.wait(1.0)
+            self.active += 1
+            wait = self.resume_at.get(worker_id, 0) - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+    def release(self, worker_id, throttled):
+        """Frees the worker's slot and records the result; throttled=None records nothing."""
+        with self._cond:
+            self.active -= 1
+            if throttled is None:
+                self._cond.notify_all()
+                return
+            self.window.append(not throttled)
+            delay = self.delay.get(worker_id, self.min_delay)
+            if throttled:
+                self.throttle_events += 1
+                # Places already in flight when the block started fail together: cut once per cooldown
+                if time.time() - self.last_cut >= self.cooldown / 2:
+                    self.allowed = max(1.0, self.allowed / 2)
+                    self.last_cut = time.time()
+                delay = min(self.max_delay, max(1.0, delay * 2))
+                pause = self.cooldown * random.uniform(0.5, 1.5)
+                print(f"[WARN] Throttled: concurrency -> {int(self.allowed)}, worker {worker_id} pauses {pause:.0f}s "
+                      f"(success rate {self.success_rate():.0%}).")
+            else:
+                self.allowed = min(float(self.max_workers), self.allowed + 1 / self.allowed)
+                delay = max(self.min_delay, delay * 0.9 - 0.1)
+                pause = 0
+            self.delay[worker_id] = delay
+            self.resume_at[worker_id] = time.time() + delay + pause
+            self._cond.notify_all()
+
+    def should_retry(self, idx):
+        with self._cond:
+            self.retries[idx] = self.retries.get(idx, 0) + 1
+            return self.retries[idx] <= self.max_retries
+
+    def success_rate(self):
+        return sum(self.window) / len(self.window) if self.window else 1.0
+
+    def summary(self):
+        with self._cond:
+            return {"throttle_events": self.throttle_events, "concurrency": int(self.allowed),
+                    "success_rate": round(self.success_rate(), 3)}
@@ -0,0 +1,251 @@
+"""
+Leased task queue for sharing one scrape job between several machines.
+
+A coordinator owns a SQLite queue and serves it over HTTP; workers lease a
+task, heartbeat while they scrape it, and report the outcome. A lease that is
+not renewed in time (worker crashed, host lost) goes back to the queue, up to
+`max_attempts` leases per task.
+
+    queue = TaskQueue("all_reviews/queue.sqlite3")      # coordinator / local stand-in
+    server = make_queue_server(queue, "0.0.0.0", 8780, token="...")  # a token is required off loopback
+    client = RemoteTaskQueue("http://coordinator:8780")  # same methods as TaskQueue
+"""
+import hmac
+import json
+import time
+import sqlite3
+import ipaddress
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+
+class TaskQueue:
+    """SQLite-backed queue. Thread-safe; also usable directly by workers on one host."""
+    def __init__(self, path, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " id INTEGER PRIMARY KEY,"
+            " key TEXT UNIQUE NOT NULL,"
+            " source_url TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " lease_expires REAL,"
+            " review_count INTEGER,"
+            " detail TEXT,"
+            " updated REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status, id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS job (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def add(self, items, key=lambda url: url):
+        """Enqueues (source_url, url) pairs; places already queued (same key) are left alone."""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks (key, source_url, url, updated) VALUES (?, ?, ?, ?)",
+                [(key(url), source, url, time.time()) for source, url in items],
+            )
+            return self._conn.total_changes - before
+
+    def set_job(self, **settings):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job (name, value) VALUES (?, ?)",
+                [(k, json.dumps(v)) for k, v in settings.items()],
+            )
+
+    def job(self):
+        with self._lock:
+            return {k: json.loads(v) for k, v in self._conn.execute("SELECT name, value FROM job")}
+
+    def _expire(self, now):
+        self._conn.execute(
+            "UPDATE tasks SET status = 'failed', worker = NULL, detail = 'lease expired', updated = ?"
+            " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        self._conn.execute(
+            "UPDATE tasks SET status = 'pending', worker = NULL, updated = ?"
+            " WHERE status = 'leased' AND lease_expires < ?",
+            (now, now),
+        )
+
+    def lease(self, worker, limit=1):
+        """Leases up to `limit` pending tasks (requeueing expired leases first)."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._expire(now)
+            rows = self._conn.execute(
+                "SELECT id, source_url, url, attempts FROM tasks WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, attempts = attempts + 1,"
+                " lease_expires = ?, updated = ? WHERE id = ?",
+                [(worker, now + self.lease_seconds, now, r[0]) for r in rows],
+            )
+        return [{"id": r[0], "source_url": r[1], "url": r[2], "attempt": r[3] + 1} for r in rows]
+
+    def heartbeat(self, worker, ids):
+        """Extends the worker's leases. Returns the ids it still holds."""
+        now = time.time()
+        held = []
+        with self._lock, self._conn:
+            for task_id in ids:
+                cur = self._conn.execute(
+                    "UPDATE tasks SET lease_expires = ?, updated = ?"
+                    " WHERE id = ? AND worker = ? AND status = 'leased'",
+                    (now + self.lease_seconds, now, task_id, worker),
+                )
+                if cur.rowcount:
+                    held.append(task_id)
+        return held
+
+    def complete(self, worker, task_id, status, review_count=0, detail=None):
+        """Records 'done' / 'partial' / 'skipped' / 'failed' for a task the worker holds. Returns False if the lease was lost."""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE tasks SET status = ?, review_count = ?, detail = ?, worker = NULL, updated = ?"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (status, review_count, detail, time.time(), task_id, worker),
+            )
+        return cur.rowcount > 0
+
+    def release(self, worker, task_id):
+        """Gives a task back for another try (e.g. the browser crashed)."""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE tasks SET status = 'pending', worker = NULL, updated = ?"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time(), task_id, worker),
+            )
+        return cur.rowcount > 0
+
+    def stats(self):
+        with self._lock, self._conn:
+            self._expire(time.time())
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        counts["remaining"] = counts.get("pending", 0) + counts.get("leased", 0)
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def make_queue_server(task_queue, host="127.0.0.1", port=8780, token=None):
+    """
+    Builds (but does not start) the coordinator's HTTP API: POST /<method> with JSON
+    arguments. Anyone who can reach it can lease and complete tasks, so binding to
+    anything but loopback requires a token.
+    """
+    if not token and not is_loopback(host):
+        raise ValueError(f"refusing to serve the queue on {host} without a token")
+    expected = f"Bearer {token}".encode("utf-8") if token else None
+    methods = {
+        "lease": task_queue.lease,
+        "heartbeat": task_queue.heartbeat,
+        "complete": task_queue.complete,
+        "release": task_queue.release,
+        "stats": task_queue.stats,
+        "job": task_queue.job,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            given = self.headers.get("Authorization", "").encode("utf-8")
+            if expected and not hmac.compare_digest(given, expected):
+                self._send({"error": "unauthorized"}, 401)
+                return
+            method = methods.get(self.path.strip("/"))
+            if not method:
+                self._send({"error": "unknown method"}, 404)
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                kwargs = json.loads(self.rfile.read(length) or b"{}")
+                self._send({"result": method(**kwargs)})
+            except (TypeError, ValueError) as e:
+                self._send({"error": str(e)}, 400)
+
+        def _send(self, payload, code=200):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+class RemoteTaskQueue:
+    """Client for make_queue_server() with the same methods as TaskQueue."""
+    def __init__(self, base_url, token=None, timeout=30, retries=5):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _call(self, method, **kwargs):
+        for attempt in range(self.retries):
+            try:
+                response = self.session.post(f"{self.base_url}/{method}", json=kwargs, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()["result"]
+            except requests.RequestException as e:
+                if attempt == self.retries - 1:
+                    raise
+                print(f"[WARN] Coordinator call {method} failed ({e}), retrying...")
+                time.sleep(2 ** attempt)
+
+    def lease(self, worker, limit=1):
+        return self._call("lease", worker=worker, limit=limit)
+
+    def heartbeat(self, worker, ids):
+        return self._call("heartbeat", worker=worker, ids=list(ids))
+
+    def complete(self, worker, task_id, status, review_count=0, detail=None):
+        return self._call("complete", worker=worker, task_id=task_id, status=status,
+                          review_count=review_count, detail=detail)
+
+    def release(self, worker, task_id):
+        return self._call("release", worker=worker, task_id=task_id)
+
+    def stats(self):
+        return self._call("stats")
+
+    def job(self):
+        return self._call("job")
+
+    def close(self):
+        self.session.close()